@@ -2,59 +2,110 @@
 import schedule
 import time
 import threading
-import json
 import os
+import math
+from datetime import datetime, timezone
 from scraper import NewsScraper
+from fetcher import FeedFetcher
+from seen_store import SqliteSeenStore, entry_key
+from news_cache import NewsCache
+from shared_cache import SharedNewsStore, LeaderLock
 from mailer import EmailService
+from outbox import Outbox
+from subscribers import SubscriberStore
+from archive import ArticleArchive
+from instrumentation import instrument
 
 app = Flask(__name__)
+instrument(app)
 SUBSCRIBERS_FILE = 'subscribers.json'
 
+# Long-lived so ETag/Last-Modified validators survive between refreshes
+FEED_FETCHER = FeedFetcher()
+# Articles already mailed out; shared by all workers and kept across restarts
+DIGEST_SEEN_STORE = SqliteSeenStore('seen_articles.db')
+# Under gunicorn -w N only the worker holding this lock scrapes and runs the schedule
+LEADER = LeaderLock('leader.lock')
+# Durable record of every digest run, so a restart resumes unsent recipients
+OUTBOX = Outbox('outbox.db')
+
+# Indexed subscriber list; the old subscribers.json is imported on first start
+SUBSCRIBERS = SubscriberStore('subscribers.db', legacy_json=SUBSCRIBERS_FILE)
+SUBSCRIBERS_PAGE_SIZE = 100
+
+# Every article ever scraped, full-text indexed; the cache only holds the last 24 hours
+ARCHIVE = ArticleArchive('archive.db')
+SEARCH_PAGE_SIZE = 20
+
 def load_subscribers():
-    if not os.path.exists(SUBSCRIBERS_FILE):
-        return []
-    with open(SUBSCRIBERS_FILE, 'r') as f:
-        try:
-            return json.load(f)
-        except:
-            return []
-
-def save_subscribers(subs):
-    with open(SUBSCRIBERS_FILE, 'w') as f:
-        json.dump(subs, f, indent=4)
+    return SUBSCRIBERS.all()
+
+JOB_LOCK = threading.Lock()
 
 def run_job():
+    # Never let two digest runs overlap (scheduler + /api/run-now)
+    if not JOB_LOCK.acquire(blocking=False):
+        print("Job already running, skipping.")
+        return
+    try:
+        _run_job()
+    finally:
+        JOB_LOCK.release()
+
+def _run_job():
     print("Running scheduled job...")
     # Use the cache updater to get fresh news
     news = update_cache()
+    # The cache is a rolling window, so only mail articles no digest has carried yet
+    news = [item for item in news if entry_key(item['link']) not in DIGEST_SEEN_STORE]
     
     if news:
         recipients = load_subscribers()
         if recipients:
             emailer = EmailService()
-            emailer.send_digest(news, recipients)
+            # Marked as mailed in the same step that queues the digest, never before
+            keys = [entry_key(item['link']) for item in news]
+            emailer.send_digest(news, recipients, outbox=OUTBOX,
+                                claim=lambda: DIGEST_SEEN_STORE.claim_all(keys))
         else:
             print("No subscribers to send to.")
     else:
         print("No new news found.")
 
 def run_schedule():
-    schedule.every().day.at("09:00").do(run_job)
     while True:
-        schedule.run_pending()
+        # Followers keep trying so one takes over if the leader worker dies
+        if LEADER.acquire():
+            if not schedule.get_jobs():
+                print(f"Worker {os.getpid()} elected leader; scheduling jobs.")
+                schedule.every().day.at("09:00").do(run_job)
+                schedule.every(CACHE_DURATION).seconds.do(NEWS_CACHE.refresh)
+                NEWS_CACHE.refresh()
+                # Finish any digest a previous leader was sending when it died
+                threading.Thread(target=EmailService().resume, args=(OUTBOX,), daemon=True).start()
+            if NEWS_STORE.pop_refresh_request():
+                NEWS_CACHE.refresh()
+            schedule.run_pending()
         time.sleep(1)
 
-# Start scheduler in background
-scheduler_thread = threading.Thread(target=run_schedule, daemon=True)
-scheduler_thread.start()
-
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def subscribers_page():
+    """One page of subscribers; ?limit= and ?cursor= (from next_cursor) page through."""
+    limit = min(max(request.args.get('limit', SUBSCRIBERS_PAGE_SIZE, type=int), 1), 1000)
+    cursor = request.args.get('cursor', type=int)
+    emails, next_cursor = SUBSCRIBERS.page(limit=limit, cursor=cursor)
+    return jsonify({
+        'subscribers': emails,
+        'next_cursor': next_cursor,
+        'total': SUBSCRIBERS.count()
+    })
+
 @app.route('/api/subscribers', methods=['GET'])
 def get_subscribers():
-    return jsonify(load_subscribers())
+    return subscribers_page()
 
 @app.route('/api/subscribers', methods=['POST'])
 def add_subscriber():
@@ -63,67 +114,132 @@ def add_subscriber():
     if not email:
         return jsonify({'error': 'Email is required'}), 400
     
-    subs = load_subscribers()
-    if email not in subs:
-        subs.append(email)
-        save_subscribers(subs)
-    
-    return jsonify(subs)
+    SUBSCRIBERS.add(email)
+    return subscribers_page()
 
 @app.route('/api/subscribers', methods=['DELETE'])
 def remove_subscriber():
     data = request.json
     email = data.get('email')
-    subs = load_subscribers()
-    if email in subs:
-        subs.remove(email)
-        save_subscribers(subs)
-    return jsonify(subs)
-
-# Global Cache
-NEWS_CACHE = {
-    'data': [],
-    'last_updated': 0
-}
+    if email:
+        SUBSCRIBERS.remove(email)
+    return subscribers_page()
+
 CACHE_DURATION = 1800  # 30 minutes
 
-def update_cache():
-    global NEWS_CACHE
+def fetch_news():
     print("Updating news cache...")
-    scraper = NewsScraper()
+    scraper = NewsScraper(fetcher=FEED_FETCHER)
     news = scraper.get_news(lookback_hours=24)
-    if news:
-        NEWS_CACHE['data'] = news
-        NEWS_CACHE['last_updated'] = time.time()
-        print(f"Cache updated with {len(news)} articles.")
+    print(f"Cache updated with {len(news)} articles.")
+    try:
+        print(f"Archived {ARCHIVE.add(news)} new articles.")
+    except Exception as e:
+        # The live cache matters more; the next refresh archives them again
+        print(f"Archiving failed: {e}")
     return news
 
+# Global Cache: serves stale data while one coalesced refresh runs in the background.
+# Workers share one snapshot; only the leader scrapes and publishes it.
+NEWS_STORE = SharedNewsStore('news_cache.db')
+NEWS_CACHE = NewsCache(fetch_news, ttl=CACHE_DURATION, store=NEWS_STORE, is_leader=LEADER.is_leader)
+
+def update_cache():
+    """Refreshes the cache (joining any refresh already in flight) and returns the news."""
+    return NEWS_CACHE.refresh(wait=True)
+
 def get_cached_news():
-    global NEWS_CACHE
-    current_time = time.time()
-    
-    # If cache is empty or stale, refresh
-    if not NEWS_CACHE['data'] or (current_time - NEWS_CACHE['last_updated'] > CACHE_DURATION):
-        return update_cache()
-    
-    return NEWS_CACHE['data']
+    return NEWS_CACHE.get()
+
+# --- Startup ---
+# Nothing starts at import, so gunicorn can preload this module in its master
+# and fork workers from it (see gunicorn.conf.py). Threads don't survive a
+# fork, so each worker starts its own scheduler.
+BACKGROUND_PID = None
+
+def warm():
+    """Loads what the first requests need, before any traffic is accepted."""
+    NEWS_CACHE.load()  # The last snapshot any worker published, so /api/news is warm after a deploy
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+def start_background():
+    """Starts this process's scheduler thread; safe to call again."""
+    global BACKGROUND_PID
+    if BACKGROUND_PID == os.getpid():
+        return
+    BACKGROUND_PID = os.getpid()
+    threading.Thread(target=run_schedule, daemon=True).start()
+
+@app.before_request
+def ensure_background():
+    # Covers servers that don't run the gunicorn.conf.py hooks
+    start_background()
 
 @app.route('/api/news', methods=['GET'])
 def get_news_api():
     try:
         # Return cached news to avoid blocking
-        # If the cache is empty, this calls update_cache() which might block, 
-        # but only for the first user or after restart.
+        # Only a cold cache waits (bounded), for the first user after restart.
         news = get_cached_news()
         return jsonify(news)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def parse_date(value):
+    """Unix time, or an ISO date/datetime (UTC unless it says otherwise)."""
+    try:
+        ts = float(value)
+    except ValueError:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    if not math.isfinite(ts):  # NaN would match nothing, without an error
+        raise ValueError(f"Not a finite time: {value}")
+    return ts
+
+@app.route('/api/news/search', methods=['GET'])
+def search_news():
+    """
+    Searches the archive: ?q= (words, "phrases", prefix*), ?source=,
+    ?since= / ?until= (ISO date or Unix time), ?limit= and ?cursor= (from next_cursor).
+    Best match first with ?q=, newest first without.
+    """
+    limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), 100)
+    try:
+        since, until = (parse_date(request.args[name]) if request.args.get(name) else None
+                        for name in ('since', 'until'))
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO dates or Unix times'}), 400
+    try:
+        articles, next_cursor = ARCHIVE.search(
+            query=request.args.get('q') or None,
+            source=request.args.get('source') or None,
+            since=since,
+            until=until,
+            limit=limit,
+            cursor=request.args.get('cursor') or None,
+        )
+    except ValueError:
+        return jsonify({'error': 'cursor must be a next_cursor from an earlier page'}), 400
+    return jsonify({
+        'articles': [article.to_dict() for article in articles],
+        'next_cursor': next_cursor
+    })
+
 @app.route('/api/refresh-cache', methods=['POST'])
 def force_refresh():
-    threading.Thread(target=update_cache).start()
+    if LEADER.is_leader():
+        NEWS_CACHE.refresh()
+    else:
+        NEWS_STORE.request_refresh()
     return jsonify({'status': 'Background refresh started'})
 
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify(NEWS_CACHE.stats())
+
 
 @app.route('/api/run-now', methods=['POST'])
 def trigger_run():
@@ -132,9 +248,9 @@ def trigger_run():
     return jsonify({'status': 'Job started'})
 
 if __name__ == '__main__':
-    # Warm up cache immediately on startup
-    threading.Thread(target=update_cache, daemon=True).start()
-    
+    # The scheduler thread refreshes the cache as soon as this process is elected leader
+    warm()
+    start_background()
     print("Starting server on http://localhost:5000 (accessible on network)")
     app.run(debug=True, port=5000, use_reloader=False, host='0.0.0.0') 
     # use_reloader=False to prevent double scheduler execution
@@ -0,0 +1,199 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from articles import Article
+from seen_store import entry_key
+
+TERM_RE = re.compile(r'"[^"]*"|\S+')
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+TITLE_WEIGHT = 2.0  # bm25() weight of a title hit over a summary hit
+
+
+def fts_query(text):
+    """
+    Turns free text into a safe FTS5 query: every word must match, "quoted
+    phrases" match as phrases and a trailing * matches a word prefix.
+    Operators and punctuation are treated as plain text. Returns None if no words are left.
+    """
+    terms = []
+    for raw in TERM_RE.findall(text or ''):
+        prefix = raw.endswith('*') and not raw.startswith('"')
+        words = WORD_RE.findall(raw)
+        if not words:
+            continue
+        term = '"' + ' '.join(words) + '"'
+        terms.append(term + '*' if prefix else term)
+    return ' '.join(terms) or None
+
+
+class ArticleArchive:
+    """
+    Every article ever ingested, in SQLite (WAL) with an FTS5 index over
+    title and summary.
+
+    Rows are keyed on the normalized link, so re-scraping the same 24-hour
+    window only inserts what is new. Triggers keep the index in step with the
+    table, so each scrape indexes just its new or edited articles. Text
+    searches come back best match first (BM25, title weighted over summary);
+    filter-only listings newest first, walking the publish-time index and
+    stopping after one page. Both page on a keyset cursor, so a deep page
+    costs the same as the first.
+    """
+    def __init__(self, path='archive.db'):
+        self.path = os.path.abspath(path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS articles ("
+                " id INTEGER PRIMARY KEY,"
+                " link_key TEXT NOT NULL UNIQUE,"
+                " title TEXT NOT NULL,"
+                " link TEXT NOT NULL,"
+                " summary TEXT NOT NULL,"
+                " source TEXT NOT NULL,"
+                " published TEXT,"
+                " published_ts REAL,"
+                " sort_ts REAL NOT NULL,"
+                " ingested_at REAL NOT NULL,"
+                " score REAL,"
+                " also_in TEXT"
+                ");"
+                "CREATE INDEX IF NOT EXISTS articles_sort ON articles (sort_ts);"
+                "CREATE INDEX IF NOT EXISTS articles_source ON articles (source);"
+                # External-content index: the text lives once, in `articles`
+                "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+                " title, summary, content='articles', content_rowid='id',"
+                " tokenize='porter unicode61'"
+                ");"
+                "CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN"
+                " INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);"
+                " END;"
+                "CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN"
+                " INSERT INTO articles_fts (articles_fts, rowid, title, summary)"
+                " VALUES ('delete', old.id, old.title, old.summary);"
+                " END;"
+                # Only text edits touch the index; score / also_in updates don't
+                "CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF title, summary ON articles BEGIN"
+                " INSERT INTO articles_fts (articles_fts, rowid, title, summary)"
+                " VALUES ('delete', old.id, old.title, old.summary);"
+                " INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);"
+                " END;"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add(self, articles):
+        """
+        Upserts a scrape's articles in one transaction. Returns how many were new.
+        Already-archived articles keep their row and id; changed text is re-indexed.
+        """
+        now = time.time()
+        # Oldest first, so row ids (the tie-break in searches) follow publish time within a scrape
+        articles = sorted((a for a in articles if a.link), key=lambda a: a.published_ts or now)
+        rows = [
+            (entry_key(a.link), a.title or '', a.link, a.summary or '', a.source or '', a.published,
+             a.published_ts, a.published_ts or now, now, a.score,
+             json.dumps(a.also_in) if a.also_in else None)
+            for a in articles
+        ]
+        with self._connect() as conn:
+            added = conn.executemany(
+                "INSERT INTO articles (link_key, title, link, summary, source, published,"
+                " published_ts, sort_ts, ingested_at, score, also_in)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (link_key) DO NOTHING",
+                rows
+            ).rowcount  # Counts only the rows inserted, not the trigger's index writes
+            conn.executemany(
+                "UPDATE articles SET title = ?, summary = ?, score = ?, also_in = ?"
+                " WHERE link_key = ? AND (title IS NOT ? OR summary IS NOT ?"
+                " OR score IS NOT ? OR also_in IS NOT ?)",
+                ((title, summary, score, also_in, key, title, summary, score, also_in)
+                 for key, title, _, summary, _, _, _, _, _, score, also_in in rows)
+            )
+        return added
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def search(self, query=None, source=None, since=None, until=None, limit=20, cursor=None):
+        """
+        Returns (articles, next_cursor): up to `limit` Articles matching all of
+        the given filters, best match first for a `query` and newest first
+        without one. `query` is free text (see fts_query), `since` / `until`
+        are Unix times bounding the publish date (ingest time for undated
+        articles) and `cursor` is a previous call's next_cursor, which is None
+        on the last page. Raises ValueError for a non-finite time or a
+        malformed cursor.
+        """
+        for bound in (since, until):
+            if bound is not None and not math.isfinite(bound):
+                raise ValueError("since and until must be finite")
+        after = _parse_cursor(cursor) if cursor else None
+        match = fts_query(query)
+        if query is not None and match is None:
+            return [], None  # Nothing searchable in the query
+        columns = ("a.id, a.title, a.link, a.summary, a.source, a.published,"
+                   " a.published_ts, a.score, a.also_in")
+        if match:
+            # Ranked by the full-text index; a title hit counts double, as in relevance.py
+            sql = (f"SELECT {columns}, bm25(articles_fts, {TITLE_WEIGHT}, 1.0) AS sort_key"
+                   " FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid"
+                   " WHERE articles_fts MATCH ?")
+            params = [match]
+        else:
+            sql = f"SELECT {columns}, a.sort_ts AS sort_key FROM articles a WHERE 1"
+            params = []
+        if source:
+            sql += " AND a.source = ?"
+            params.append(source)
+        if since is not None:
+            sql += " AND a.sort_ts >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND a.sort_ts < ?"
+            params.append(until)
+        if match:
+            # bm25() is lower for better matches
+            sql = f"SELECT * FROM ({sql})"
+            if after:
+                sql += " WHERE sort_key > ? OR (sort_key = ? AND id < ?)"
+                params += [after[0], after[0], after[1]]
+            sql += " ORDER BY sort_key, id DESC LIMIT ?"
+        else:
+            if after:
+                sql += " AND (a.sort_ts, a.id) < (?, ?)"
+                params += list(after)
+            sql += " ORDER BY a.sort_ts DESC, a.id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._connect().execute(sql, params).fetchall()
+        next_cursor = f"{rows[limit - 1][-1]!r}:{rows[limit - 1][0]}" if len(rows) > limit else None
+        articles = [
+            Article(title=title, link=link, summary=summary, source=source, published=published,
+                    published_ts=published_ts, score=score, also_in=json.loads(also_in) if also_in else None)
+            for _, title, link, summary, source, published, published_ts, score, also_in, _ in rows[:limit]
+        ]
+        return articles, next_cursor
+
+
+def _parse_cursor(cursor):
+    """(sort key, row id) from a next_cursor."""
+    key, _, row_id = cursor.rpartition(':')
+    key = float(key)
+    if not math.isfinite(key):
+        raise ValueError("Malformed cursor")
+    return key, int(row_id)
@@ -0,0 +1,206 @@
+import calendar
+import html
+import re
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from xml.etree.ElementTree import XMLPullParser, ParseError
+
+from instrumentation import span
+
+# Longest summary any consumer shows (the web UI; the digest cuts to 300)
+SUMMARY_LIMIT = 500
+# Feeds are newest-first; after this many consecutive too-old entries, stop reading
+STALE_RUN = 3
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+CONTENT = '{http://purl.org/rss/1.0/modules/content/}'
+TAG_RE = re.compile(r'<[^>]+>')
+SPACE_RE = re.compile(r'\s+')
+
+
+@dataclass(slots=True)
+class Article:
+    """One normalized news item. Slots keep thousands of these small in memory."""
+    title: str
+    link: str
+    summary: str
+    source: str
+    published: str
+    published_ts: float = None  # Unix time, None if the feed gave no date
+    score: float = None  # Keyword relevance (see relevance.py)
+    also_in: list = None  # Other sources that carried the same story
+
+    def __getitem__(self, key):
+        # Lets templates and older callers keep using item['title'] style access
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def clean_summary(text, limit=SUMMARY_LIMIT):
+    """
+    Strips markup and collapses whitespace, once, at ingest. Entities are
+    decoded before tags are stripped, so entity-encoded markup
+    (&lt;script&gt;) is stripped too. The result is plain text; escape it
+    wherever it goes into HTML.
+    """
+    if not text:
+        return 'No summary available.'
+    while True:
+        decoded = html.unescape(text)
+        if decoded == text:
+            break
+        text = decoded
+    while True:
+        stripped = TAG_RE.sub(' ', text)
+        if stripped == text:
+            break
+        text = stripped
+    text = SPACE_RE.sub(' ', text).strip()
+    if len(text) > limit:
+        text = text[:limit].rsplit(' ', 1)[0]
+    return text
+
+
+def _parse_date(value):
+    """RFC 822 (RSS) or ISO 8601 (Atom) date -> Unix time."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _text(elem, *tags):
+    for tag in tags:
+        child = elem.find(tag)
+        if child is not None and (child.text or '').strip():
+            return child.text.strip()
+    return ''
+
+
+def _rss_item(elem, source):
+    published = _text(elem, 'pubDate', '{http://purl.org/dc/elements/1.1/}date')
+    link = _text(elem, 'link') or _text(elem, 'guid')
+    return Article(
+        title=_text(elem, 'title'),
+        link=link,
+        summary=clean_summary(_text(elem, 'description', CONTENT + 'encoded')),
+        source=source,
+        published=published or 'Unknown date',
+        published_ts=_parse_date(published),
+    )
+
+
+def _atom_entry(elem, source):
+    link = ''
+    for child in elem.findall(ATOM + 'link'):
+        if child.get('rel', 'alternate') == 'alternate':
+            link = child.get('href', '')
+            break
+    published = _text(elem, ATOM + 'published', ATOM + 'updated')
+    return Article(
+        title=_text(elem, ATOM + 'title'),
+        link=link or _text(elem, ATOM + 'id'),
+        summary=clean_summary(_text(elem, ATOM + 'summary', ATOM + 'content')),
+        source=source,
+        published=published or 'Unknown date',
+        published_ts=_parse_date(published),
+    )
+
+
+def parse_feed_stream(chunks, url, cutoff=None):
+    """
+    Incrementally parses an RSS 2.0 or Atom feed from an iterable of byte chunks.
+
+    Entries are built as soon as their closing tag arrives and their XML is
+    dropped right away. Once STALE_RUN entries in a row are older than `cutoff`
+    (Unix time) the rest of the feed is not read at all. Anything the strict
+    XML parser rejects is handed to feedparser instead.
+    Returns (feed_title, [Article, ...]).
+    """
+    parser = XMLPullParser(events=('start', 'end'))
+    entry_tags = ('item', ATOM + 'entry')
+    in_entry = False
+    title = None
+    articles = []
+    stale = 0
+    consumed = []
+    chunks = iter(chunks)  # One pass, so a fallback resumes where parsing stopped
+
+    try:
+        for chunk in chunks:
+            consumed.append(chunk)
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                tag = elem.tag
+                if event == 'start':
+                    in_entry = in_entry or tag in entry_tags
+                    continue
+                if tag == 'title' or tag == ATOM + 'title':
+                    # The first title outside an entry is the feed's own
+                    if title is None and not in_entry:
+                        title = (elem.text or '').strip()
+                    continue
+                if tag == 'item':
+                    article = _rss_item(elem, title or url)
+                elif tag == ATOM + 'entry':
+                    article = _atom_entry(elem, title or url)
+                else:
+                    continue
+                in_entry = False
+                elem.clear()
+                if cutoff and article.published_ts and article.published_ts < cutoff:
+                    stale += 1
+                    if stale >= STALE_RUN:
+                        return title or url, articles
+                    continue
+                stale = 0
+                articles.append(article)
+        parser.close()
+    except ParseError:
+        # Malformed XML: let the forgiving parser have the whole document (read so far, plus the rest)
+        consumed.extend(chunks)
+        return parse_feed_fallback(b''.join(consumed), url)
+
+    if not articles and not stale:
+        # No RSS 2.0 / Atom entries at all (e.g. RSS 1.0/RDF): defer to feedparser
+        return parse_feed_fallback(b''.join(consumed), url)
+    return title or url, articles
+
+
+def parse_feed_fallback(content, url):
+    """Full feedparser parse, for feeds the streaming parser can't handle."""
+    import feedparser  # Rarely needed, so not paid for at startup
+    with span('feedparser.parse'):
+        feed = feedparser.parse(content)
+    source = feed.feed.get('title', url)
+    articles = []
+    for entry in feed.entries:
+        parsed = entry.get('published_parsed')
+        articles.append(Article(
+            title=entry.get('title', ''),
+            link=entry.get('link') or entry.get('id', ''),
+            summary=clean_summary(entry.get('summary')),
+            source=source,
+            published=entry.get('published', 'Unknown date'),
+            published_ts=calendar.timegm(parsed) if parsed else None,
+        ))
+    return source, articles
@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from articles import parse_feed_stream
+from instrumentation import span
+
+USER_AGENT = "AI-News-Bot/1.0 (+feedparser)"
+
+
+class FeedFetcher:
+    """
+    Downloads feeds concurrently over a bounded thread pool.
+
+    Feeds are parsed while they download and reading stops once entries fall
+    outside the lookback window (see articles.parse_feed_stream).
+    Remembers each feed's ETag / Last-Modified validators and the last parsed
+    result, so the next fetch is a conditional GET. A 304 reuses the stored
+    parse instead of downloading and parsing the feed again.
+    Keep one instance alive for the lifetime of the process to benefit from it.
+    """
+    def __init__(self, max_workers=8, timeout=10):
+        self.max_workers = max_workers
+        self.timeout = timeout  # Seconds, applied per feed
+        self._cache = {}  # url -> {'etag', 'modified', 'cutoff', 'feed'}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._session.headers['User-Agent'] = USER_AGENT
+
+    def fetch(self, url, cutoff=None):
+        """
+        Fetches a single feed, returning (feed_title, [Article, ...]).
+        Entries older than `cutoff` (Unix time) may be left out.
+        """
+        with self._lock:
+            cached = self._cache.get(url)
+
+        headers = {}
+        # A stored parse cut at a later cutoff is missing entries this call wants
+        if cached and (cached['cutoff'] is None or (cutoff is not None and cutoff >= cached['cutoff'])):
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['modified']:
+                headers['If-Modified-Since'] = cached['modified']
+
+        # Download and streaming parse overlap, so they are timed together
+        with span('feed.fetch'), self._session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and headers:
+                print(f"Not modified {url}: reusing {len(cached['feed'][1])} entries")
+                return cached['feed']
+
+            response.raise_for_status()
+            # Closing the response early (on return) skips the rest of the download
+            feed = parse_feed_stream(response.iter_content(chunk_size=16384), url, cutoff)
+        print(f"Parsed {url}: kept {len(feed[1])} entries")
+
+        etag = response.headers.get('ETag')
+        modified = response.headers.get('Last-Modified')
+        with self._lock:
+            if etag or modified:
+                self._cache[url] = {'etag': etag, 'modified': modified, 'cutoff': cutoff, 'feed': feed}
+            else:
+                self._cache.pop(url, None)
+        return feed
+
+    def fetch_all(self, urls, cutoff=None):
+        """
+        Fetches all `urls` at the same time.
+        Returns a list of (url, feed) pairs in input order; feed is None on failure.
+        """
+        if not urls:
+            return []
+
+        def safe_fetch(url):
+            try:
+                return self.fetch(url, cutoff)
+            except Exception as e:
+                print(f"Error fetching {url}: {e}")
+                return None
+
+        workers = min(self.max_workers, len(urls))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='feed') as pool:
+            feeds = list(pool.map(safe_fetch, urls))
+        return list(zip(urls, feeds))
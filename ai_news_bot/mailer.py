@@ -1,19 +1,193 @@
+import html
 import smtplib
+import queue
+import threading
+import time
+from email import policy
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 from dotenv import load_dotenv
+from instrumentation import span
 
 load_dotenv()
 
+DIGEST_HEADER = """
+        <html>
+        <body style="font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background-color: #f4f4f9; padding: 20px;">
+            <div style="max-width: 600px; margin: 0 auto; background: #ffffff; padding: 30px; border-radius: 10px; box-shadow: 0 0 10px rgba(0,0,0,0.1);">
+                <h2 style="color: #333; border-bottom: 2px solid #5a67d8; padding-bottom: 10px;">AI News Updates</h2>
+                <ul style="padding-left: 0; list-style: none;">
+        """
+
+DIGEST_ITEM = """
+            <li style="margin-bottom: 25px; border-bottom: 1px solid #eee; padding-bottom: 15px;">
+                <strong style="font-size: 1.1em;"><a href="{link}" style="color: #5a67d8; text-decoration: none;">{title}</a></strong><br/>
+                <span style="color: #888; font-size: 0.85em; display: block; margin-top: 5px;">{source} &bull; {published}</span>
+                <p style="color: #555; line-height: 1.6; margin-top: 10px;">{summary}...</p>
+            </li>
+            """
+
+DIGEST_FOOTER = """
+                </ul>
+                <p style="font-size: 0.8em; color: #aaa; text-align: center; margin-top: 30px;">Automated by AI News Bot</p>
+            </div>
+        </body>
+        </html>
+        """
+
+# SMTP reply codes worth retrying: temporary failures and dropped connections
+TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+
+def render_digest(news_items):
+    """Builds the digest's subject and HTML body once for every recipient."""
+    subject = f"Daily AI News Digest - {len(news_items)} Updates"
+    parts = [DIGEST_HEADER]
+    parts.extend(
+        DIGEST_ITEM.format(
+            # Feed text is plain text from here on, so escape everything that goes into the HTML
+            link=html.escape(item['link'] if item['link'].startswith(('http://', 'https://')) else '#'),
+            title=html.escape(item['title']),
+            source=html.escape(item['source'] + (f" (also {', '.join(item.get('also_in'))})" if item.get('also_in') else '')),
+            published=html.escape(item['published']),
+            summary=html.escape(item['summary'][:300])
+        )
+        for item in news_items
+    )
+    parts.append(DIGEST_FOOTER)
+    return subject, ''.join(parts)
+
+
 class EmailService:
     def __init__(self):
         self.email_address = os.getenv("EMAIL_ADDRESS")
         self.email_password = os.getenv("EMAIL_PASSWORD")
         self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
         self.smtp_port = int(os.getenv("SMTP_PORT", 587))
+        self.use_starttls = os.getenv("SMTP_STARTTLS", "true").lower() != "false"
+        self.pool_size = int(os.getenv("SMTP_POOL_SIZE", 4))
+        self.max_retries = int(os.getenv("SMTP_MAX_RETRIES", 3))
+        self.retry_backoff = float(os.getenv("SMTP_RETRY_BACKOFF", 1.0))
+
+    def build_message(self, subject, html_content):
+        """
+        Serializes the digest once. Per-recipient sends only prepend a To header,
+        so the MIME tree and its encoding are never rebuilt.
+        """
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = self.email_address
+        msg.attach(MIMEText(html_content, "html"))
+        return msg.as_bytes(policy=policy.SMTP)
+
+    def _connect(self):
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        if self.use_starttls:
+            server.starttls()
+        server.login(self.email_address, self.email_password)
+        return server
 
-    def send_digest(self, news_items, recipients=None):
+    def deliver(self, payload, recipients, on_result=None):
+        """
+        Sends the serialized `payload` to each recipient individually (nobody sees
+        the rest of the list), fanning out over `pool_size` SMTP connections.
+
+        Transient failures are retried with exponential backoff. Returns a report
+        {recipient: {'status': 'sent'|'failed', 'attempts': n, 'error': str|None}};
+        `on_result(recipient, result)` is also called as each one finishes.
+        """
+        work = queue.Queue()
+        for recipient in recipients:
+            work.put(recipient)
+        report = {}
+        report_lock = threading.Lock()
+
+        def record(recipient, result):
+            with report_lock:
+                report[recipient] = result
+            if on_result:
+                on_result(recipient, result)
+
+        def worker():
+            server = None
+            try:
+                while True:
+                    try:
+                        recipient = work.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        server, result = self._send_one(server, payload, recipient)
+                    except Exception as e:
+                        # e.g. UnicodeEncodeError on a non-ASCII address: fail this one, keep the worker
+                        result = {'status': 'failed', 'attempts': 1, 'error': f"{type(e).__name__}: {e}"}
+                        if server is not None:
+                            try:
+                                server.quit()
+                            except Exception:
+                                pass
+                            server = None  # The session may be mid-command; start clean
+                    record(recipient, result)
+                    if result['status'] == 'sent':
+                        print(f"Sent to {recipient}")
+                    else:
+                        print(f"Failed to send to {recipient}: {result['error']}")
+            finally:
+                if server is not None:
+                    try:
+                        server.quit()
+                    except Exception:
+                        pass
+
+        workers = [
+            threading.Thread(target=worker, daemon=True)
+            for _ in range(max(1, min(self.pool_size, len(recipients))))
+        ]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        return report
+
+    def _send_one(self, server, payload, recipient):
+        """Returns (server, result); reconnects `server` if it dropped."""
+        if '\r' in recipient or '\n' in recipient:
+            return server, {'status': 'failed', 'attempts': 0, 'error': 'Invalid address'}
+
+        message = f"To: {recipient}\r\n".encode('utf-8') + payload
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                if server is None:
+                    server = self._connect()
+                with span('smtp.sendmail'):
+                    server.sendmail(self.email_address, recipient, message)
+                return server, {'status': 'sent', 'attempts': attempt, 'error': None}
+            except smtplib.SMTPResponseException as e:
+                error = f"{e.smtp_code} {e.smtp_error!r}"
+                if e.smtp_code < 400 or e.smtp_code >= 500:
+                    break  # Permanent rejection, retrying won't help
+            except smtplib.SMTPRecipientsRefused as e:
+                code, reply = e.recipients.get(recipient, (550, str(e)))
+                error = f"{code} {reply!r}"
+                if code < 400 or code >= 500:
+                    break  # e.g. 550 no such user; a 4xx (mailbox busy, greylisting) is retried
+            except TRANSIENT_ERRORS as e:
+                error = str(e)
+                server = None
+            if attempt < self.max_retries:
+                time.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+        return server, {'status': 'failed', 'attempts': attempt, 'error': error}
+
+    def send_digest(self, news_items, recipients=None, outbox=None, claim=None):
+        """
+        Mails the digest. With an `outbox` the run is queued durably first;
+        `claim()` is then called inside the enqueue transaction (see
+        Outbox.enqueue), so the articles count as mailed only once the job is
+        queued, and not at all if the run stops earlier (mock mode, no
+        credentials, no recipients).
+        """
         if not news_items:
             print("No news to send.")
             return
@@ -25,50 +199,15 @@ def send_digest(self, news_items, recipients=None):
         if recipients is None:
             # Default to self if no recipients provided (legacy behavior) or empty list
             recipients = [self.email_address]
-        
+
         if not recipients:
              print("No recipients to send to.")
              return
 
         print(f"Sending digest to {len(recipients)} recipients...")
 
-        subject = f"Daily AI News Digest - {len(news_items)} Updates"
-        
-        # Build HTML body
-        html_content = """
-        <html>
-        <body style="font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background-color: #f4f4f9; padding: 20px;">
-            <div style="max-width: 600px; margin: 0 auto; background: #ffffff; padding: 30px; border-radius: 10px; box-shadow: 0 0 10px rgba(0,0,0,0.1);">
-                <h2 style="color: #333; border-bottom: 2px solid #5a67d8; padding-bottom: 10px;">AI News Updates</h2>
-                <ul style="padding-left: 0; list-style: none;">
-        """
-        
-        for item in news_items:
-            html_content += f"""
-            <li style="margin-bottom: 25px; border-bottom: 1px solid #eee; padding-bottom: 15px;">
-                <strong style="font-size: 1.1em;"><a href="{item['link']}" style="color: #5a67d8; text-decoration: none;">{item['title']}</a></strong><br/>
-                <span style="color: #888; font-size: 0.85em; display: block; margin-top: 5px;">{item['source']} &bull; {item['published']}</span>
-                <p style="color: #555; line-height: 1.6; margin-top: 10px;">{item['summary'][:300]}...</p>
-            </li>
-            """
-            
-        html_content += """
-                </ul>
-                <p style="font-size: 0.8em; color: #aaa; text-align: center; margin-top: 30px;">Automated by AI News Bot</p>
-            </div>
-        </body>
-        </html>
-        """
+        subject, html_content = render_digest(news_items)
 
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = self.email_address
-        # We will send individually to avoid exposing all emails in TO/CC
-        # Alternatively, use BCC. For simplicity/anti-spam, individual sends or BCC is better.
-        # Here using BCC approach for efficiency, or loop for personalization. 
-        # Let's do a loop for now to ensure delivery, though slower for massive lists.
-        # Actually, standard best practice for personal bots:
-        
         # MOCK MODE CHECK
         if os.getenv("MOCK_EMAIL_MODE") == "true":
             print("----------------------------------------------------------------")
@@ -82,26 +221,32 @@ def send_digest(self, news_items, recipients=None):
             print("----------------------------------------------------------------")
             return
 
-        try:
-             with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.email_address, self.email_password)
-                
-                for recipient in recipients:
-                    msg_clone = MIMEMultipart("alternative")
-                    msg_clone["Subject"] = subject
-                    msg_clone["From"] = self.email_address
-                    msg_clone["To"] = recipient
-                    msg_clone.attach(MIMEText(html_content, "html"))
-                    
-                    try:
-                        server.sendmail(self.email_address, recipient, msg_clone.as_string())
-                        print(f"Sent to {recipient}")
-                    except Exception as e:
-                        print(f"Failed to send to {recipient}: {e}")
-                        
-        except Exception as e:
-            print(f"SMTP Error: {e}")
+        # Individual sends so recipients never see each other's addresses
+        payload = self.build_message(subject, html_content)
+        if outbox is not None:
+            # Durable path: record the run before sending so a crash can resume it
+            job_id = outbox.enqueue(subject, payload, recipients, claim=claim)
+            if job_id is None:
+                return None
+            # A drain already running here (e.g. a resume) may not have seen this
+            # job; wait for it, so the status reported is the job's own
+            outbox.drain(self, wait=True)
+            return outbox.job_status(job_id)
+
+        if claim is not None and not claim():
+            print("Digest articles already claimed by another run; not sending.")
+            return None
+
+        report = self.deliver(payload, recipients)
+        sent = sum(1 for r in report.values() if r['status'] == 'sent')
+        print(f"Digest delivered to {sent}/{len(recipients)} recipients.")
+        return report
+
+    def resume(self, outbox):
+        """Finishes digest jobs interrupted by a crash or restart."""
+        if not self.email_address or not self.email_password:
+            return {}
+        return outbox.drain(self)
 
 if __name__ == "__main__":
     # Test run (requires .env)
@@ -1,24 +1,38 @@
 import schedule
 import time
 from scraper import NewsScraper
+from fetcher import FeedFetcher
+from seen_store import SqliteSeenStore, entry_key
 from mailer import EmailService
+from outbox import Outbox
 from datetime import datetime
 import sys
 
+# Long-lived so ETag/Last-Modified validators survive between runs
+FEED_FETCHER = FeedFetcher()
+# Persistent so restarts don't re-send articles from earlier digests
+SEEN_STORE = SqliteSeenStore('seen_articles.db')
+OUTBOX = Outbox('outbox.db')
+
 def job():
     print(f"[{datetime.now()}] Starting daily news job...")
-    scraper = NewsScraper()
+    scraper = NewsScraper(fetcher=FEED_FETCHER)
     news = scraper.get_news(lookback_hours=24)
+    # Only articles no earlier digest carried; they are marked as mailed once queued (as in app.py)
+    news = [item for item in news if entry_key(item['link']) not in SEEN_STORE]
     
     if news:
         print(f"Found {len(news)} new items. Sending email...")
         emailer = EmailService()
-        emailer.send_digest(news)
+        keys = [entry_key(item['link']) for item in news]
+        emailer.send_digest(news, outbox=OUTBOX, claim=lambda: SEEN_STORE.claim_all(keys))
     else:
         print("No new news found in the last 24 hours.")
 
 def main():
     print("AI News Bot started.")
+    # Resume a digest that was cut off by a crash or restart
+    EmailService().resume(OUTBOX)
     print("Scheduling daily digest for 09:00 AM EST (System time).")
     
     # Schedule the job
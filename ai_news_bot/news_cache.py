@@ -0,0 +1,159 @@
+import threading
+import time
+
+
+class NewsCache:
+    """
+    Stale-while-revalidate cache around a slow `loader` (the feed scrape).
+
+    - Fresh data is returned straight away (hit).
+    - Expired data is still returned straight away, and a background refresh
+      is kicked off (stale hit).
+    - Concurrent refreshes are coalesced: at most one loader call is in flight,
+      and everyone asking for a refresh meanwhile waits on that same call.
+    Only a cold cache (never loaded) makes a caller wait, and at most `cold_wait`
+    seconds.
+
+    With a shared `store` (see shared_cache.SharedNewsStore), only the worker
+    for which `is_leader()` is true runs the loader and publishes the result;
+    every other worker just picks up the leader's latest snapshot.
+    """
+    SYNC_INTERVAL = 2  # Seconds between version checks against the shared store
+
+    def __init__(self, loader, ttl=1800, cold_wait=10, store=None, is_leader=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.cold_wait = cold_wait
+        self.store = store
+        self.is_leader = is_leader or (lambda: True)
+        self._data = []
+        self._last_updated = 0
+        self._version = 0
+        self._last_sync = 0
+        self._lock = threading.Lock()
+        self._inflight = None  # threading.Event of the running refresh
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'refresh_errors': 0,
+            'coalesced': 0,
+            'last_refresh_seconds': 0.0,
+            'max_refresh_seconds': 0.0,
+            'total_refresh_seconds': 0.0,
+        }
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def last_updated(self):
+        return self._last_updated
+
+    def load(self):
+        """Adopts the shared store's latest snapshot right away (warm-up before serving)."""
+        self._sync_from_store(force=True)
+
+    def get(self):
+        """Returns cached news, never blocking on feeds once the cache is warm."""
+        self._sync_from_store()
+        with self._lock:
+            age = time.time() - self._last_updated
+            if not self._last_updated:
+                self._stats['misses'] += 1
+                cold = True
+            elif age > self.ttl:
+                self._stats['stale_hits'] += 1
+                cold = False
+            else:
+                self._stats['hits'] += 1
+                return self._data
+
+        done = self.refresh()
+        if cold:
+            done.wait(self.cold_wait)
+        return self._data
+
+    def refresh(self, wait=False):
+        """
+        Starts a background refresh unless one is already running.
+        Returns the refresh's Event; with `wait=True`, blocks until it is set
+        and returns the data instead.
+        """
+        with self._lock:
+            if self._inflight is not None:
+                self._stats['coalesced'] += 1
+                done = self._inflight
+            else:
+                done = self._inflight = threading.Event()
+                threading.Thread(target=self._run_refresh, args=(done,), daemon=True).start()
+
+        if wait:
+            done.wait()
+            return self._data
+        return done
+
+    def _sync_from_store(self, force=False):
+        """Adopts the shared snapshot if another worker has published a newer one."""
+        if self.store is None:
+            return
+        now = time.time()
+        if not force and now - self._last_sync < self.SYNC_INTERVAL:
+            return
+        self._last_sync = now
+        try:
+            if self.store.version() == self._version:
+                return
+            version, updated_at, news = self.store.read()
+        except Exception as e:
+            print(f"Shared cache read failed: {e}")
+            return
+        with self._lock:
+            if version > self._version:
+                self._version = version
+                self._data = news
+                self._last_updated = updated_at
+
+    def _run_refresh(self, done):
+        start = time.perf_counter()
+        try:
+            if self.store is not None and not self.is_leader():
+                # Followers never scrape; the leader refreshes on its own schedule
+                self._sync_from_store(force=True)
+                return
+            news = self.loader()
+            with self._lock:
+                # Keep the previous copy if a refresh comes back empty
+                if news or not self._data:
+                    self._data = news or []
+                self._last_updated = time.time()
+                data = self._data
+            if self.store is not None:
+                version = self.store.write(data)
+                with self._lock:
+                    self._version = version
+        except Exception as e:
+            print(f"Cache refresh failed: {e}")
+            with self._lock:
+                self._stats['refresh_errors'] += 1
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._stats['refreshes'] += 1
+                self._stats['last_refresh_seconds'] = elapsed
+                self._stats['total_refresh_seconds'] += elapsed
+                self._stats['max_refresh_seconds'] = max(self._stats['max_refresh_seconds'], elapsed)
+                self._inflight = None
+            done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._data)
+            stats['age_seconds'] = time.time() - self._last_updated if self._last_updated else None
+            stats['refreshing'] = self._inflight is not None
+            stats['version'] = self._version
+            stats['leader'] = self.store is None or self.is_leader()
+        return stats
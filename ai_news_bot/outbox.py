@@ -0,0 +1,234 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class Outbox:
+    """
+    On-disk queue of digest jobs and their per-recipient send status.
+
+    A digest is enqueued with its serialized message and full recipient list
+    before anything is sent. Each recipient is marked as soon as its send
+    finishes, so after a crash `drain()` resumes with only the unsent ones.
+    Delivery is at-least-once: a send in flight when the process died is
+    retried on resume.
+
+    Several processes may drain the same file (any gunicorn worker can run a
+    digest). Each one claims a batch of pending recipients in a single UPDATE
+    before sending, so no recipient is handed to two senders. Claims held by a
+    process that has since died go back to pending.
+    """
+    BATCH_SIZE = 200  # Recipients handed to one pooled `deliver` call
+
+    def __init__(self, path='outbox.db', rate=None):
+        self.path = os.path.abspath(path)
+        # Messages per second across the whole pool; None or 0 means unthrottled
+        self.rate = rate if rate is not None else float(os.getenv("SMTP_SEND_RATE", 0))
+        self._local = threading.local()
+        self._drain_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " created_at REAL NOT NULL,"
+                " subject TEXT NOT NULL,"
+                " payload BLOB NOT NULL,"
+                " status TEXT NOT NULL DEFAULT 'pending'"
+                ");"
+                "CREATE TABLE IF NOT EXISTS deliveries ("
+                " job_id INTEGER NOT NULL REFERENCES jobs(id),"
+                " recipient TEXT NOT NULL,"
+                " status TEXT NOT NULL DEFAULT 'pending',"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " error TEXT,"
+                " updated_at REAL,"
+                " owner TEXT,"
+                " PRIMARY KEY (job_id, recipient)"
+                ") WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS deliveries_pending_idx ON deliveries (job_id, status);"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(deliveries)")}
+            if 'owner' not in columns:  # Outboxes created before claims existed
+                conn.execute("ALTER TABLE deliveries ADD COLUMN owner TEXT")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, subject, payload, recipients, claim=None):
+        """
+        Records a digest run and its recipients in one transaction. Returns the
+        job id. `claim()`, if given, runs inside that transaction just before
+        it commits (to mark the digest's articles as mailed); if it returns
+        False nothing is queued and the result is None.
+        """
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO jobs (created_at, subject, payload) VALUES (?, ?, ?)",
+                (time.time(), subject, payload)
+            )
+            job_id = cur.lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO deliveries (job_id, recipient) VALUES (?, ?)",
+                ((job_id, r) for r in recipients)
+            )
+            if claim is not None and not claim():
+                conn.rollback()
+                print("Digest articles already claimed by another run; nothing queued.")
+                return None
+        print(f"Queued digest job {job_id} for {len(recipients)} recipients.")
+        return job_id
+
+    def pending_jobs(self):
+        return [row[0] for row in self._connect().execute(
+            "SELECT id FROM jobs WHERE status = 'pending' ORDER BY id"
+        )]
+
+    def mark(self, job_id, recipient, result):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE deliveries SET status = ?, attempts = attempts + ?, error = ?, updated_at = ?"
+                " WHERE job_id = ? AND recipient = ?",
+                (result['status'], result['attempts'], result['error'], time.time(), job_id, recipient)
+            )
+
+    def job_status(self, job_id):
+        """Returns {'pending': n, 'sending': n, 'sent': n, 'failed': n} for a job."""
+        counts = {'pending': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+        for status, n in self._connect().execute(
+            "SELECT status, COUNT(*) FROM deliveries WHERE job_id = ? GROUP BY status", (job_id,)
+        ):
+            counts[status] = n
+        return counts
+
+    def drain(self, emailer, wait=False):
+        """
+        Sends every unsent recipient of every pending job through
+        `emailer.deliver`, at no more than `rate` messages per second.
+        Returns {job_id: status counts}. If this process is already draining,
+        returns {} at once, or with `wait` drains what is left once it's done.
+        """
+        if not self._drain_lock.acquire(blocking=wait):
+            print("Outbox already draining, skipping.")
+            return {}
+        try:
+            self._release_dead_claims()
+            summary = {}
+            for job_id in self.pending_jobs():
+                self._drain_job(job_id, emailer)
+                summary[job_id] = self.job_status(job_id)
+            return summary
+        finally:
+            self._drain_lock.release()
+
+    def _owner(self):
+        """This process's claim tag: pid plus a per-process token, so a reused pid isn't mistaken for us."""
+        if getattr(self, '_owner_pid', None) != os.getpid():
+            self._owner_pid = os.getpid()
+            self._owner_tag = f"{os.getpid()}:{uuid.uuid4().hex}"
+        return self._owner_tag
+
+    def _release_dead_claims(self):
+        """Returns recipients claimed by processes that are gone to pending."""
+        conn = self._connect()
+        owners = [row[0] for row in conn.execute(
+            "SELECT DISTINCT owner FROM deliveries WHERE status = 'sending'"
+        )]
+        dead = [owner for owner in owners if owner != self._owner() and not _owner_alive(owner)]
+        if dead:
+            with conn:
+                conn.executemany(
+                    "UPDATE deliveries SET status = 'pending', owner = NULL WHERE status = 'sending' AND owner = ?",
+                    ((owner,) for owner in dead)
+                )
+
+    def _claim_batch(self, job_id):
+        """Atomically takes up to BATCH_SIZE pending recipients of a job for this process."""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(
+                "UPDATE deliveries SET status = 'sending', owner = ?, updated_at = ?"
+                " WHERE job_id = ? AND recipient IN ("
+                "  SELECT recipient FROM deliveries WHERE job_id = ? AND status = 'pending' LIMIT ?"
+                " ) RETURNING recipient",
+                (self._owner(), time.time(), job_id, job_id, self.BATCH_SIZE)
+            )]
+
+    def _release_claims(self, job_id):
+        """Returns this process's unfinished claims on a job to pending. Returns how many there were."""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE deliveries SET status = 'pending', owner = NULL"
+                " WHERE job_id = ? AND status = 'sending' AND owner = ?",
+                (job_id, self._owner())
+            ).rowcount
+
+    def _pacer(self):
+        """Returns a callable that blocks each sender until its slot under `rate`."""
+        if not self.rate:
+            return lambda: None
+        interval = 1.0 / self.rate
+        lock = threading.Lock()
+        next_slot = [time.monotonic()]
+
+        def wait():
+            with lock:
+                now = time.monotonic()
+                slot = max(next_slot[0], now)
+                next_slot[0] = slot + interval
+            if slot > now:
+                time.sleep(slot - now)
+        return wait
+
+    def _drain_job(self, job_id, emailer):
+        conn = self._connect()
+        payload = conn.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        pace = self._pacer()
+
+        def on_result(recipient, result):
+            self.mark(job_id, recipient, result)
+            pace()
+
+        while True:
+            batch = self._claim_batch(job_id)
+            if not batch:
+                break
+            emailer.deliver(payload, batch, on_result=on_result)
+            if self._release_claims(job_id):
+                print(f"Digest job {job_id} has unrecorded sends; leaving them for the next drain.")
+                return
+
+        with self._connect() as conn:
+            # Another process may still be sending its share; the last one to finish closes the job
+            done = conn.execute(
+                "UPDATE jobs SET status = 'done' WHERE id = ? AND NOT EXISTS ("
+                " SELECT 1 FROM deliveries WHERE job_id = ? AND status IN ('pending', 'sending'))",
+                (job_id, job_id)
+            ).rowcount
+        if not done:
+            return
+        counts = self.job_status(job_id)
+        print(f"Digest job {job_id} finished: {counts['sent']} sent, {counts['failed']} failed.")
+
+
+def _owner_alive(owner):
+    """Whether the process behind a claim tag (see Outbox._owner) is still running on this host."""
+    try:
+        pid = int((owner or '').split(':', 1)[0])
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return False  # Our pid with another token: an earlier process that had the same pid
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, owned by someone else
+    return True
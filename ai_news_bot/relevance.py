@@ -0,0 +1,197 @@
+import re
+from collections import defaultdict
+from dataclasses import replace
+
+# --- Relevance & Near-Duplicate Filtering ---
+# One batched pass over a scrape: score every article against a precompiled
+# keyword table, cut the off-topic ones, then collapse stories syndicated
+# across feeds with MinHash + LSH (each article is hashed into a few band
+# buckets and only articles sharing a bucket are ever compared, so the cost
+# grows linearly with the number of articles rather than with every pair).
+
+# Keyword -> weight. A trailing * matches any word ending ("model*" -> "models").
+KEYWORDS = {
+    'artificial intelligence': 3, 'machine learning': 3, 'deep learning': 3,
+    'ai': 2, 'genai': 3, 'generative': 2, 'llm*': 3, 'large language model*': 3,
+    'language model*': 2, 'foundation model*': 3, 'neural': 2, 'transformer*': 1,
+    'gpt*': 2, 'chatgpt': 2, 'gemini': 2, 'claude': 2, 'llama': 2, 'mistral': 1,
+    'openai': 2, 'anthropic': 2, 'deepmind': 2, 'hugging face': 1, 'nvidia': 1,
+    'agent*': 1, 'agentic': 2, 'chatbot*': 1, 'copilot': 1, 'multimodal': 2,
+    'diffusion': 1, 'reinforcement learning': 2, 'robot*': 1, 'computer vision': 2,
+    'inference': 1, 'fine-tun*': 2, 'training': 1, 'dataset*': 1, 'benchmark*': 1,
+    'model*': 1, 'sagemaker': 1, 'bedrock': 1, 'vertex ai': 1, 'alignment': 1,
+}
+TITLE_WEIGHT = 2      # A keyword in the title counts this many times
+MIN_SCORE = 2         # Articles scoring less are dropped as off-topic
+
+SHINGLE_SIZE = 2      # Words per shingle
+NUM_BINS = 32         # MinHash signature length (one-permutation hashing)
+BANDS = 8             # LSH bands of NUM_BINS / BANDS rows -> candidates from ~0.6 similarity
+DUPLICATE_THRESHOLD = 0.5  # Jaccard similarity of shingle sets that counts as the same story
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+_MAX_HASH = (1 << 64) - 1
+
+
+def _compile_keywords(keywords):
+    """
+    The whole table as one regex, factored into a character trie so the engine
+    follows a single branch per letter instead of retrying every keyword at
+    every word. Each text is scanned once.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword.rstrip('*'):
+            node = node.setdefault(ch, {})
+        node['*' if keyword.endswith('*') else '$'] = None
+
+    def build(node):
+        alternatives = [
+            (r'\s+' if ch == ' ' else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items()) if ch not in ('*', '$')
+        ]
+        # Ends go last so the longest keyword wins
+        if '*' in node:
+            alternatives.append(r'[\w-]*')
+        if '$' in node:
+            alternatives.append(r'\b')
+        return alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+
+    return re.compile(r'\b' + build(trie), re.IGNORECASE)
+
+
+class KeywordScorer:
+    """Weighted keyword hits in title and summary; build once, reuse for every scrape."""
+    def __init__(self, keywords=KEYWORDS, title_weight=TITLE_WEIGHT):
+        self.title_weight = title_weight
+        self._pattern = _compile_keywords(keywords)
+        # Matched text -> weight, resolved per distinct match and then remembered
+        self._keywords = [(k.rstrip('*'), k.endswith('*'), w) for k, w in keywords.items()]
+        self._weights = {}
+
+    def _weight(self, match):
+        word = ' '.join(match.lower().split())
+        weight = self._weights.get(word)
+        if weight is None:
+            weight = max(
+                (w for k, stem, w in self._keywords if word == k or (stem and word.startswith(k))),
+                default=0,
+            )
+            self._weights[word] = weight
+        return weight
+
+    def score(self, title, summary):
+        # Each keyword counts once per field, so a keyword-stuffed summary can't dominate
+        title_hits = {m.lower() for m in self._pattern.findall(title or '')}
+        summary_hits = {m.lower() for m in self._pattern.findall(summary or '')}
+        return (self.title_weight * sum(self._weight(m) for m in title_hits)
+                + sum(self._weight(m) for m in summary_hits))
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Set of hashed word n-grams. Signatures never leave the process, so the
+    built-in (per-process salted) hash is enough and much cheaper than a digest.
+    """
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        words = words + [''] * (size - len(words))
+    return {hash(gram) & _MAX_HASH for gram in zip(*(words[i:] for i in range(size)))}
+
+
+def minhash(shingle_set, num_bins=NUM_BINS):
+    """
+    One-permutation MinHash: each shingle hash lands in bin (h % num_bins) and
+    each bin keeps its minimum, so a signature costs one pass over the shingles.
+    Empty bins borrow from the next non-empty one (densification).
+    """
+    bins = [_MAX_HASH] * num_bins
+    for h in shingle_set:
+        b = h % num_bins
+        if h < bins[b]:
+            bins[b] = h
+    if any(v != _MAX_HASH for v in bins):
+        for i in range(num_bins):
+            j, offset = i, 0
+            while bins[j] == _MAX_HASH:
+                j = (j + 1) % num_bins
+                offset += 1
+            if offset:
+                bins[i] = (bins[j] + offset * 0x9E3779B97F4A7C15) & _MAX_HASH
+    return bins
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def near_duplicate_groups(texts, threshold=DUPLICATE_THRESHOLD, bands=BANDS):
+    """
+    Groups of indices into `texts` that tell the same story. LSH candidates
+    are confirmed on exact shingle-set similarity before they are merged.
+    """
+    sets = [shingles(t) for t in texts]
+    rows = NUM_BINS // bands
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = defaultdict(list)
+    for i, s in enumerate(sets):
+        signature = minhash(s)
+        for band in range(bands):
+            buckets[(band, tuple(signature[band * rows:(band + 1) * rows]))].append(i)
+
+    checked = set()
+    for members in buckets.values():
+        for n, i in enumerate(members):
+            for j in members[n + 1:]:
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                if find(i) != find(j) and jaccard(sets[i], sets[j]) >= threshold:
+                    parent[find(j)] = find(i)
+
+    groups = defaultdict(list)
+    for i in range(len(texts)):
+        groups[find(i)].append(i)
+    return list(groups.values())
+
+
+SCORER = KeywordScorer()
+
+
+def rank_articles(articles, min_score=MIN_SCORE, limit=None, scorer=SCORER):
+    """
+    Scores, filters, de-duplicates and orders a batch of Articles. Of each
+    group of near-duplicates the highest-scoring (then earliest) article is
+    kept, and the other sources are listed in .also_in. Returns the survivors,
+    best first, at most `limit` of them.
+
+    The inputs are never written to: fetcher parses and cache snapshots hand
+    the same Article objects to concurrent readers, so scored and merged
+    articles are new instances (dataclasses.replace).
+    """
+    relevant = []
+    for article in articles:
+        score = scorer.score(article.title, article.summary)
+        if score >= min_score:
+            relevant.append(replace(article, score=score))
+
+    kept = []
+    for group in near_duplicate_groups([f"{a.title} {a.summary}" for a in relevant]):
+        members = sorted((relevant[i] for i in group),
+                         key=lambda a: (-a.score, a.published_ts or float('inf')))
+        best = members[0]
+        others = sorted({a.source for a in members[1:]} - {best.source})
+        kept.append(replace(best, also_in=others or None))
+
+    kept.sort(key=lambda a: (-a.score, -(a.published_ts or 0)))
+    return kept[:limit] if limit else kept
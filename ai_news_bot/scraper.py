@@ -1,9 +1,10 @@
-import feedparser
-from datetime import datetime, timedelta
 import time
+from fetcher import FeedFetcher
+from seen_store import MemorySeenStore, entry_key
+from relevance import MIN_SCORE, rank_articles
 
 class NewsScraper:
-    def __init__(self):
+    def __init__(self, fetcher=None, seen_store=None):
         self.feeds = [
             "https://openai.com/blog/rss.xml",
             "https://blog.google/technology/ai/rss/",
@@ -12,49 +13,45 @@ def __init__(self):
             "https://www.theverge.com/rss/artificial-intelligence/index.xml",
             "https://news.mit.edu/rss/topic/artificial-intelligence2"
         ]
-        self.seen_entries = set()
+        # Pluggable: pass a SqliteSeenStore to dedup across runs and processes
+        self.seen_entries = seen_store if seen_store is not None else MemorySeenStore()
+        # Share one fetcher across scrapers so conditional GET validators persist
+        self.fetcher = fetcher or FeedFetcher()
 
-    def get_news(self, lookback_hours=24):
+    def get_news(self, lookback_hours=24, min_score=MIN_SCORE, limit=None):
         """
         Fetches news from the last `lookback_hours` from configured feeds.
+        Returns a list of articles.Article records, most relevant first, with
+        off-topic items cut and near-duplicate stories collapsed.
         """
         news_items = []
-        # Calculate the cutoff time (current time - lookback period)
-        # Note: robust time comparison depends on feed time formats (struct_time).
-        # For simplicity, we'll fetch everything on the first run or filtering loosely if needed.
-        # But commonly we just want "new stuff since last check" or "last 24h".
+        # One cutoff for the whole refresh; entries without a date are kept
+        cutoff = time.time() - lookback_hours * 3600
         
         print(f"Checking {len(self.feeds)} feeds...")
         
-        for url in self.feeds:
-            try:
-                feed = feedparser.parse(url)
-                print(f"Parsed {url}: found {len(feed.entries)} entries")
-                
-                for entry in feed.entries:
-                    # Basic deduplication
-                    if entry.link in self.seen_entries:
-                        continue
-                        
-                    # Time filtering (optional, but good for 'daily' digest)
-                    # Many feeds have 'published_parsed' which is a struct_time
-                    if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                        published_dt = datetime.fromtimestamp(time.mktime(entry.published_parsed))
-                        if datetime.now() - published_dt > timedelta(hours=lookback_hours):
-                            continue
-                            
-                    self.seen_entries.add(entry.link)
-                    news_items.append({
-                        'title': entry.title,
-                        'link': entry.link,
-                        'summary': getattr(entry, 'summary', 'No summary available.'),
-                        'source': feed.feed.get('title', url),
-                        'published': getattr(entry, 'published', 'Unknown date')
-                    })
-            except Exception as e:
-                print(f"Error parsing {url}: {e}")
+        for url, feed in self.fetcher.fetch_all(self.feeds, cutoff=cutoff):
+            if feed is None:
+                continue
+            _, articles = feed
+            for article in articles:
+                # A 304 reuses an older parse, so re-check the window
+                if article.published_ts and article.published_ts < cutoff:
+                    continue
 
-        return news_items
+                # Basic deduplication
+                key = entry_key(article.link)
+                if key in self.seen_entries:
+                    continue
+
+                # Claim is atomic, so a concurrent process can't also take it
+                if not self.seen_entries.claim(key):
+                    continue
+                news_items.append(article)
+
+        ranked = rank_articles(news_items, min_score=min_score, limit=limit)
+        print(f"Kept {len(ranked)} of {len(news_items)} articles after relevance and duplicate filtering.")
+        return ranked
 
 if __name__ == "__main__":
     # Test run
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_TTL = 14 * 24 * 3600  # Two weeks, comfortably past any lookback window
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+
+def normalize_link(link):
+    """Canonical form of an article URL so trivially different links dedup together."""
+    link = (link or '').strip()
+    parts = urlsplit(link)
+    if not parts.scheme or not parts.netloc:
+        return link
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ''))
+
+
+def entry_key(link, guid=None):
+    """Stable hash of an article's normalized link (or GUID when there is no link)."""
+    return hashlib.sha1(normalize_link(link or guid).encode('utf-8')).hexdigest()
+
+
+class MemorySeenStore:
+    """
+    Bounded in-process seen set: LRU on size, with time-based eviction.
+    Used on its own for a single refresh, and as the hot layer of SqliteSeenStore.
+    """
+    def __init__(self, max_size=10000, ttl=DEFAULT_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> first seen timestamp
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            seen_at = self._items.get(key)
+            if seen_at is None:
+                return False
+            if time.time() - seen_at > self.ttl:
+                del self._items[key]
+                return False
+            self._items.move_to_end(key)
+            return True
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, key, seen_at=None):
+        with self._lock:
+            self._items[key] = seen_at or self._items.get(key) or time.time()
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def claim(self, key):
+        """Marks `key` as seen. Returns True if it had not been seen before."""
+        if key in self:
+            return False
+        self.add(key)
+        return True
+
+
+class SqliteSeenStore:
+    """
+    Persistent seen index shared by every process that opens the same file.
+
+    Claims are a single INSERT OR IGNORE, so two gunicorn workers racing on
+    the same article cannot both treat it as new. Rows older than `ttl` are
+    pruned periodically, which keeps the file (and the LRU in front) bounded.
+    """
+    PRUNE_INTERVAL = 3600
+
+    def __init__(self, path='seen_articles.db', ttl=DEFAULT_TTL, lru_size=10000):
+        self.path = os.path.abspath(path)
+        self.ttl = ttl
+        self._lru = MemorySeenStore(max_size=lru_size, ttl=ttl)
+        self._local = threading.local()
+        self._last_prune = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                " key TEXT PRIMARY KEY,"
+                " seen_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS seen_at_idx ON seen (seen_at)")
+
+    def _connect(self):
+        # sqlite3 connections must not be shared across threads, or across a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __contains__(self, key):
+        if key in self._lru:
+            return True
+        row = self._connect().execute(
+            "SELECT seen_at FROM seen WHERE key = ? AND seen_at >= ?",
+            (key, time.time() - self.ttl)
+        ).fetchone()
+        if row:
+            self._lru.add(key, row[0])
+            return True
+        return False
+
+    def add(self, key):
+        self.claim(key)
+
+    def claim(self, key):
+        """Marks `key` as seen. Returns True if no process had seen it before."""
+        if key in self._lru:
+            return False
+        now = time.time()
+        self._maybe_prune(now)
+        with self._connect() as conn:
+            # Expired rows count as unseen; refresh them in place
+            cur = conn.execute(
+                "INSERT INTO seen (key, seen_at) VALUES (?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET seen_at = excluded.seen_at"
+                " WHERE seen.seen_at < ?",
+                (key, now, now - self.ttl)
+            )
+            is_new = cur.rowcount == 1
+        self._lru.add(key, now if is_new else None)
+        return is_new
+
+    def claim_all(self, keys):
+        """
+        Marks every key as seen in one transaction, or none of them if any
+        already is. Returns True if all were new (and are now claimed).
+        """
+        keys = list(dict.fromkeys(keys))
+        if any(key in self._lru for key in keys):
+            return False
+        now = time.time()
+        self._maybe_prune(now)
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")  # Take the write lock first, so check and insert can't interleave
+            for key in keys:
+                if conn.execute("SELECT 1 FROM seen WHERE key = ? AND seen_at >= ?",
+                                (key, now - self.ttl)).fetchone():
+                    return False
+            conn.executemany(
+                "INSERT INTO seen (key, seen_at) VALUES (?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET seen_at = excluded.seen_at",
+                ((key, now) for key in keys)
+            )
+        for key in keys:
+            self._lru.add(key, now)
+        return True
+
+    def _maybe_prune(self, now):
+        if now - self._last_prune < self.PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        self.prune()
+
+    def prune(self):
+        """Deletes entries older than the TTL. Returns the number removed."""
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM seen WHERE seen_at < ?", (time.time() - self.ttl,))
+        return cur.rowcount
@@ -0,0 +1,129 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from articles import Article
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, assume a single process
+    fcntl = None
+
+
+class SharedNewsStore:
+    """
+    News snapshot shared by every worker through one SQLite file.
+
+    The elected leader publishes a whole snapshot in one transaction, so
+    readers only ever see the old or the new list, never a mix. Each write
+    bumps `version`; workers poll that integer and only re-read and parse
+    the payload when it changes.
+    """
+    def __init__(self, path='news_cache.db'):
+        self.path = os.path.abspath(path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " version INTEGER NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " payload BLOB NOT NULL"
+                ")"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS refresh_request ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " requested_at REAL NOT NULL"
+                ")"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        # Not one opened before a fork (gunicorn --preload): it belongs to the parent
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def version(self):
+        row = self._connect().execute("SELECT version FROM snapshot WHERE id = 1").fetchone()
+        return row[0] if row else 0
+
+    def read(self):
+        """Returns (version, updated_at, news); version 0 means nothing published yet."""
+        row = self._connect().execute(
+            "SELECT version, updated_at, payload FROM snapshot WHERE id = 1"
+        ).fetchone()
+        if not row:
+            return 0, 0, []
+        return row[0], row[1], [Article.from_dict(d) for d in json.loads(row[2])]
+
+    def write(self, news):
+        """Atomically replaces the snapshot. Returns the new version."""
+        payload = json.dumps([a.to_dict() for a in news]).encode('utf-8')
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO snapshot (id, version, updated_at, payload) VALUES (1, 1, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET version = version + 1,"
+                " updated_at = excluded.updated_at, payload = excluded.payload",
+                (now, payload)
+            )
+        return self.version()
+
+    def request_refresh(self):
+        """Asks the leader to refresh on its next tick (used by non-leader workers)."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO refresh_request (id, requested_at) VALUES (1, ?)",
+                (time.time(),)
+            )
+
+    def pop_refresh_request(self):
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM refresh_request WHERE id = 1")
+        return cur.rowcount == 1
+
+
+class LeaderLock:
+    """
+    Elects one process among the workers via an exclusive flock on `path`.
+
+    The lock is held for the life of the process and released by the OS when
+    it exits, so another worker takes over on its next `acquire()` attempt.
+    """
+    def __init__(self, path='leader.lock'):
+        self.path = os.path.abspath(path)
+        self._fd = None
+        self._pid = None
+
+    def acquire(self):
+        """Non-blocking. Returns True while this process is the leader."""
+        if fcntl is None:
+            return True
+        if self._pid != os.getpid():
+            # A forked child must not trust the parent's descriptor; try for its own lock
+            self._fd = None
+            self._pid = os.getpid()
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def is_leader(self):
+        if fcntl is None:
+            return True
+        return self._fd is not None and self._pid == os.getpid()
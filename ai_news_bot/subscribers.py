@@ -0,0 +1,107 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class SubscriberStore:
+    """
+    Subscriber list in SQLite (WAL), safe to share between threads and workers.
+
+    Membership checks, adds and deletes each touch a single indexed row, so
+    their cost doesn't grow with the list. Listing is keyset-paginated on the
+    row id, which stays cheap however deep the page, and the total is a
+    counter row kept up to date by triggers rather than a COUNT(*).
+    """
+    def __init__(self, path='subscribers.db', legacy_json=None):
+        self.path = os.path.abspath(path)
+        self._local = threading.local()
+        self._connect().executescript("""
+            BEGIN IMMEDIATE;
+            CREATE TABLE IF NOT EXISTS subscribers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS subscriber_count (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                n INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS subscriber_added AFTER INSERT ON subscribers
+                BEGIN UPDATE subscriber_count SET n = n + 1 WHERE id = 1; END;
+            CREATE TRIGGER IF NOT EXISTS subscriber_removed AFTER DELETE ON subscribers
+                BEGIN UPDATE subscriber_count SET n = n - 1 WHERE id = 1; END;
+            -- Counted once, for a database from before the counter existed
+            INSERT OR IGNORE INTO subscriber_count (id, n) VALUES (1, (SELECT COUNT(*) FROM subscribers));
+            COMMIT;
+        """)
+        if legacy_json:
+            self._import_json(legacy_json)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _import_json(self, json_path):
+        """One-off migration from the old subscribers.json list."""
+        if not os.path.exists(json_path) or self.count():
+            return
+        with open(json_path, 'r') as f:
+            try:
+                emails = json.load(f)
+            except ValueError:
+                return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO subscribers (email, created_at) VALUES (?, ?)",
+                ((email, now) for email in emails if email)
+            )
+        print(f"Imported {len(emails)} subscribers from {json_path}.")
+
+    def __contains__(self, email):
+        row = self._connect().execute(
+            "SELECT 1 FROM subscribers WHERE email = ?", (email,)
+        ).fetchone()
+        return row is not None
+
+    def count(self):
+        return self._connect().execute("SELECT n FROM subscriber_count WHERE id = 1").fetchone()[0]
+
+    def add(self, email):
+        """Returns True if the email was newly added."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO subscribers (email, created_at) VALUES (?, ?)",
+                (email, time.time())
+            )
+        return cur.rowcount == 1
+
+    def remove(self, email):
+        """Returns True if the email was subscribed."""
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM subscribers WHERE email = ?", (email,))
+        return cur.rowcount == 1
+
+    def page(self, limit=100, cursor=None):
+        """
+        Returns (emails, next_cursor) for up to `limit` subscribers after `cursor`.
+        next_cursor is None on the last page.
+        """
+        rows = self._connect().execute(
+            "SELECT id, email FROM subscribers WHERE id > ? ORDER BY id LIMIT ?",
+            (cursor or 0, limit + 1)
+        ).fetchall()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [email for _, email in rows[:limit]], next_cursor
+
+    def all(self):
+        """Every subscriber, for the digest job."""
+        return [row[0] for row in self._connect().execute("SELECT email FROM subscribers ORDER BY id")]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app's modules are top-level (run from the app directory), so put it on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+from archive import ArticleArchive
+from articles import Article
+
+DAY = 86400
+
+
+def article(i, title, summary='', source='Example'):
+    return Article(title=title, link=f'https://example.com/{i}', summary=summary, source=source,
+                   published=None, published_ts=1_700_000_000 + i * DAY)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ArticleArchive(str(tmp_path / 'archive.db'))
+    archive.add([
+        article(0, 'Chip makers report earnings', 'Inference demand from model labs.'),
+        article(1, 'Inference costs fall', 'Cheaper inference for every lab.'),
+        article(2, 'Weekly roundup', 'Robots, chips and a little inference.'),
+        article(3, 'Robotics startup raises funds', 'Warehouse robots.'),
+    ])
+    return archive
+
+
+def titles(articles):
+    return [a.title for a in articles]
+
+
+def test_query_results_come_best_match_first(archive):
+    found, _ = archive.search(query='inference')
+    assert titles(found)[0] == 'Inference costs fall'  # In the title, and twice in the summary
+    assert set(titles(found)) == {'Inference costs fall', 'Chip makers report earnings', 'Weekly roundup'}
+
+
+def test_listing_without_query_is_newest_first(archive):
+    found, _ = archive.search()
+    assert titles(found) == ['Robotics startup raises funds', 'Weekly roundup',
+                             'Inference costs fall', 'Chip makers report earnings']
+
+
+@pytest.mark.parametrize('query', [None, 'inference'])
+def test_cursor_pages_through_every_match_once(archive, query):
+    everything, _ = archive.search(query=query)
+    seen, cursor = [], None
+    while True:
+        page, cursor = archive.search(query=query, limit=1, cursor=cursor)
+        seen += titles(page)
+        if cursor is None:
+            break
+    assert seen == titles(everything)
+
+
+def test_time_filters_bound_the_publish_date(archive):
+    start = 1_700_000_000 + DAY
+    found, _ = archive.search(since=start, until=start + 2 * DAY)
+    assert titles(found) == ['Weekly roundup', 'Inference costs fall']
+
+
+@pytest.mark.parametrize('bound', [math.nan, math.inf])
+def test_non_finite_time_is_rejected(archive, bound):
+    with pytest.raises(ValueError):
+        archive.search(since=bound)
+
+
+@pytest.mark.parametrize('cursor', ['12', 'nan:3', 'x:y'])
+def test_malformed_cursor_is_rejected(archive, cursor):
+    with pytest.raises(ValueError):
+        archive.search(cursor=cursor)
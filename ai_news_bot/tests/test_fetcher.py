@@ -0,0 +1,110 @@
+import time
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetcher import FeedFetcher
+
+
+def render_feed(name, items=5):
+    now = time.time()
+    entries = ''.join(
+        f"<item><title>{name} story {i}</title><link>http://example.com/{name}/{i}</link>"
+        f"<description>Summary {i}</description><pubDate>{formatdate(now - i * 60, usegmt=True)}</pubDate></item>"
+        for i in range(items)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{name}</title>{entries}</channel></rss>'.encode()
+
+
+class FeedServer(ThreadingHTTPServer):
+    """Local stand-in for the feed hosts: /<name> serves a feed with an ETag."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FeedHandler)
+        self.delay = {}      # path -> seconds before answering
+        self.requests = []   # (path, If-None-Match)
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+    def handle_error(self, request, client_address):
+        pass  # A client that timed out closed the socket before the answer
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get('If-None-Match')))
+        time.sleep(server.delay.get(self.path, 0))
+        etag = f'"{self.path.strip("/")}-v1"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = render_feed(self.path.strip('/'))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = FeedServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_conditional_get_reuses_parse_on_304(server):
+    fetcher = FeedFetcher()
+    title, articles = fetcher.fetch(server.url('/alpha'))
+    assert title == 'alpha'
+    assert [a.title for a in articles][:2] == ['alpha story 0', 'alpha story 1']
+
+    again = fetcher.fetch(server.url('/alpha'))
+    assert again == (title, articles)
+    assert server.requests == [('/alpha', None), ('/alpha', '"alpha-v1"')]
+
+
+def test_wider_cutoff_refetches_in_full(server):
+    fetcher = FeedFetcher()
+    fetcher.fetch(server.url('/alpha'), cutoff=time.time() - 90)
+    # The stored parse was cut at a later cutoff, so it can't answer this one
+    _, articles = fetcher.fetch(server.url('/alpha'), cutoff=time.time() - 3600)
+    assert len(articles) == 5
+    assert server.requests[-1] == ('/alpha', None)
+
+
+def test_fetch_all_runs_feeds_concurrently(server):
+    paths = ['/a', '/b', '/c', '/d']
+    for path in paths:
+        server.delay[path] = 0.3
+    fetcher = FeedFetcher(max_workers=4)
+    started = time.perf_counter()
+    results = fetcher.fetch_all([server.url(p) for p in paths])
+    elapsed = time.perf_counter() - started
+
+    assert [url for url, _ in results] == [server.url(p) for p in paths]
+    assert all(feed is not None and len(feed[1]) == 5 for _, feed in results)
+    assert elapsed < 0.3 * len(paths) / 2  # One after another would take 1.2s
+
+
+def test_fetch_all_times_out_slow_feed_alone(server):
+    server.delay['/slow'] = 1
+    fetcher = FeedFetcher(timeout=0.3)
+    results = dict(fetcher.fetch_all([server.url('/slow'), server.url('/fast')]))
+    assert results[server.url('/slow')] is None
+    assert results[server.url('/fast')][0] == 'fast'
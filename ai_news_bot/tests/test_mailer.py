@@ -0,0 +1,136 @@
+import socket
+import threading
+from collections import Counter
+
+import pytest
+
+pytest.importorskip('aiosmtpd')
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import AuthResult  # noqa: E402
+
+from mailer import EmailService, render_digest  # noqa: E402
+from outbox import Outbox  # noqa: E402
+
+NEWS = [{
+    'title': 'Model <b>release</b>',
+    'link': 'https://example.com/story',
+    'summary': 'A new model shipped.',
+    'source': 'Example',
+    'published': 'Today',
+}]
+
+
+class Mailbox:
+    """aiosmtpd handler: nobody@ is refused for good, busy@ once with a temporary error."""
+    def __init__(self):
+        self.messages = []  # (recipients, raw message)
+        self.rcpt_attempts = Counter()
+        self.sessions = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        self.rcpt_attempts[address] += 1
+        if address.startswith('nobody@'):
+            return '550 5.1.1 No such user'
+        if address.startswith('busy@') and self.rcpt_attempts[address] == 1:
+            return '451 4.3.0 Try again later'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append((list(envelope.rcpt_tos), envelope.content))
+        return '250 OK'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def mailbox():
+    handler = Mailbox()
+    controller = Controller(
+        handler, hostname='127.0.0.1', port=_free_port(),
+        authenticator=lambda *args: AuthResult(success=True), auth_require_tls=False
+    )
+    controller.start()
+    handler.port = controller.port
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def service(mailbox, monkeypatch):
+    monkeypatch.setenv('EMAIL_ADDRESS', 'bot@example.com')
+    monkeypatch.setenv('EMAIL_PASSWORD', 'secret')
+    monkeypatch.setenv('SMTP_SERVER', '127.0.0.1')
+    monkeypatch.setenv('SMTP_PORT', str(mailbox.port))
+    monkeypatch.setenv('SMTP_STARTTLS', 'false')
+    monkeypatch.setenv('SMTP_POOL_SIZE', '3')
+    monkeypatch.setenv('SMTP_RETRY_BACKOFF', '0.01')
+    monkeypatch.delenv('MOCK_EMAIL_MODE', raising=False)
+    return EmailService()
+
+
+def test_pooled_delivery_sends_one_message_per_recipient(mailbox, service):
+    recipients = [f'user{i}@example.com' for i in range(12)]
+    report = service.send_digest(NEWS, recipients)
+
+    assert all(report[r] == {'status': 'sent', 'attempts': 1, 'error': None} for r in recipients)
+    assert sorted(rcpts[0] for rcpts, _ in mailbox.messages) == sorted(recipients)
+    assert len(mailbox.sessions) == 3  # Connections are reused, one per pool slot
+
+    bodies = set()
+    for (rcpt,), raw in mailbox.messages:
+        headers, _, body = raw.partition(b'\r\n\r\n')
+        assert headers.count(b'To: ') == 1 and f'To: {rcpt}'.encode() in headers
+        bodies.add(body)
+    assert len(bodies) == 1  # Serialized once, only the To header differs
+
+
+def test_permanent_rejection_is_not_retried(mailbox, service):
+    report = service.send_digest(NEWS, ['nobody@example.com', 'user@example.com'])
+
+    assert report['nobody@example.com']['status'] == 'failed'
+    assert report['nobody@example.com']['error'].startswith('550')
+    assert mailbox.rcpt_attempts['nobody@example.com'] == 1
+    assert report['user@example.com']['status'] == 'sent'
+
+
+def test_temporary_rejection_is_retried(mailbox, service):
+    report = service.send_digest(NEWS, ['busy@example.com'])
+
+    assert report['busy@example.com'] == {'status': 'sent', 'attempts': 2, 'error': None}
+    assert mailbox.rcpt_attempts['busy@example.com'] == 2
+
+
+def test_unsendable_address_fails_without_stopping_the_pool(mailbox, service):
+    recipients = ['josé@example.com'] + [f'user{i}@example.com' for i in range(5)]
+    report = service.send_digest(NEWS, recipients)
+
+    assert report['josé@example.com']['status'] == 'failed'
+    assert sum(r['status'] == 'sent' for r in report.values()) == 5
+
+
+def test_digest_waits_for_a_drain_already_running(mailbox, service, tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.db'))
+    recipients = ['a@example.com', 'b@example.com']
+    results = []
+    with outbox._drain_lock:  # Another thread (e.g. a resume) is draining
+        sender = threading.Thread(target=lambda: results.append(service.send_digest(NEWS, recipients, outbox=outbox)))
+        sender.start()
+        sender.join(0.3)
+        assert sender.is_alive() and not mailbox.messages  # Queued, not reported as done
+        assert outbox.pending_jobs() == [1]
+    sender.join(5)
+
+    assert results == [{'pending': 0, 'sending': 0, 'sent': 2, 'failed': 0}]
+    assert outbox.pending_jobs() == []
+
+
+def test_render_digest_escapes_feed_text():
+    _, body = render_digest(NEWS + [dict(NEWS[0], link='javascript:alert(1)')])
+    assert 'Model &lt;b&gt;release&lt;/b&gt;' in body
+    assert 'javascript:' not in body
@@ -0,0 +1,34 @@
+from articles import Article
+from relevance import rank_articles
+
+
+def article(i, title, summary, source):
+    return Article(title=title, link=f'https://example.com/{source}/{i}', summary=summary,
+                   source=source, published=None, published_ts=1_700_000_000 + i)
+
+
+STORY = 'The new large language model tops every machine learning benchmark this week.'
+FEED = [
+    article(0, 'OpenAI ships a new LLM', STORY, 'Alpha'),
+    article(1, 'OpenAI ships a new LLM', STORY, 'Beta'),
+    article(2, 'Robotics lab trains agents', 'Reinforcement learning for warehouse robots.', 'Alpha'),
+    article(3, 'Local bakery opens', 'Fresh bread every morning.', 'Beta'),
+]
+
+
+def test_ranking_filters_and_collapses_duplicates():
+    ranked = rank_articles(FEED)
+    assert [a.title for a in ranked] == ['OpenAI ships a new LLM', 'Robotics lab trains agents']
+    assert all(a.score >= 2 for a in ranked)
+    assert (ranked[0].source, ranked[0].also_in) == ('Alpha', ['Beta'])  # Same score, the earlier one stays
+    assert ranked[1].also_in is None
+
+
+def test_ranking_leaves_the_input_articles_untouched():
+    before = [a.to_dict() for a in FEED]
+    ranked = rank_articles(FEED)
+    assert [a.to_dict() for a in FEED] == before  # Shared with cache snapshots and fetcher parses
+    assert not any(a is b for a in ranked for b in FEED)
+
+    # A stale merge on an earlier ranking doesn't carry over to the next one
+    assert rank_articles(FEED[1:])[0].also_in is None
@@ -0,0 +1,29 @@
+import sqlite3
+
+from subscribers import SubscriberStore
+
+
+def test_total_follows_adds_and_removes(tmp_path):
+    store = SubscriberStore(str(tmp_path / 'subscribers.db'))
+    assert store.count() == 0
+    assert store.add('a@example.com') and store.add('b@example.com')
+    assert not store.add('A@example.com')  # Same address, different case
+    assert not store.remove('nobody@example.com')
+    assert store.count() == 2
+    assert store.remove('a@example.com')
+    assert store.count() == 1
+
+
+def test_total_is_seeded_from_an_existing_list(tmp_path):
+    path = str(tmp_path / 'subscribers.db')
+    with sqlite3.connect(path) as conn:  # As created before the counter existed
+        conn.execute("CREATE TABLE subscribers (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                     " email TEXT NOT NULL UNIQUE COLLATE NOCASE, created_at REAL NOT NULL)")
+        conn.executemany("INSERT INTO subscribers (email, created_at) VALUES (?, 0)",
+                         [(f'user{i}@example.com',) for i in range(5)])
+    conn.close()
+
+    store = SubscriberStore(path)
+    assert store.count() == 5
+    store.add('new@example.com')
+    assert SubscriberStore(path).count() == 6  # Opening it again doesn't recount
@@ -0,0 +1,425 @@
+"""
+Latency and throughput benchmarks for the four Flask apps.
+
+Each app is copied to a temporary directory (so runs never touch real data,
+databases or .env files) and benchmarked in its own subprocess, with every
+network dependency replaced by the stand-ins in stubs.py.
+
+  python benchmarks/bench.py                          # all apps, Flask test client
+  python benchmarks/bench.py --app ai_news_bot --load # + concurrent load on gunicorn
+  python benchmarks/bench.py --baseline benchmarks/results/<earlier>.json
+
+Results are written as JSON (default benchmarks/results/<timestamp>.json).
+With --baseline, any route whose p50 or p90 latency grew by more than
+--threshold (default 25%) is reported and the exit status is 1.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import importlib
+import threading
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+SEED_SUBSCRIBERS = 1000
+COMPARED_METRICS = ('p50_ms', 'p90_ms')
+MIN_REGRESSION_MS = 0.5  # Ignore growth below this; sub-millisecond routes are noisy
+
+# Routes per app: (name, method, path, body). Paths and bodies may use the
+# context built by setup_<app> ({era} for example); `login` apps sign in first.
+APPS = {
+    'website': {
+        'routes': [
+            ('home', 'GET', '/', None),
+        ],
+    },
+    'mba_portfolio': {
+        'login': True,
+        'routes': [
+            ('index', 'GET', '/', None),
+            ('save', 'POST', '/api/save', '{content}'),
+            ('refine', 'POST', '/api/refine', {'text': 'We decided to ship the pilot early.'}),
+        ],
+    },
+    'market_time_machine': {
+        'routes': [
+            ('index', 'GET', '/', None),
+            ('era_data', 'GET', '/api/data/{era}', None),
+            ('era_window', 'GET', '/api/data/{era}?points=200', None),
+            ('simulate', 'POST', '/api/simulate/{era}', '{allocation}'),
+        ],
+    },
+    'ai_news_bot': {
+        'routes': [
+            ('index', 'GET', '/', None),
+            ('news', 'GET', '/api/news', None),
+            ('search', 'GET', '/api/news/search?q=ai', None),
+            ('subscribers', 'GET', '/api/subscribers', None),
+        ],
+    },
+}
+
+
+# --- Per-app setup (runs inside the worker, after the app is imported) ---
+
+def seed_ai_news_bot(workdir):
+    # Imported by SubscriberStore on first start
+    emails = [f"reader{i}@example.com" for i in range(SEED_SUBSCRIBERS)]
+    with open(os.path.join(workdir, 'subscribers.json'), 'w') as f:
+        json.dump(emails, f)
+
+
+def setup_ai_news_bot(module, client):
+    # Wait for the leader's first refresh so /api/news measures the warm path
+    deadline = time.time() + 30
+    while time.time() < deadline and not client.get('/api/news').get_json():
+        time.sleep(0.2)
+    return {}
+
+
+def setup_mba_portfolio(module, client):
+    return {'content': module.load_content()}
+
+
+def setup_market_time_machine(module, client):
+    era = module.data_provider.get_scenarios()[0]['id']
+    tickers, _, _ = module.data_provider.get_price_matrix(era)
+    weight = round(1.0 / len(tickers), 4)
+    return {'era': era, 'allocation': {'allocation': {t: weight for t in tickers}}}
+
+
+SEEDERS = {'ai_news_bot': seed_ai_news_bot}
+SETUPS = {
+    'ai_news_bot': setup_ai_news_bot,
+    'mba_portfolio': setup_mba_portfolio,
+    'market_time_machine': setup_market_time_machine,
+}
+
+
+def resolve(routes, context):
+    """Fills {placeholders} in paths and turns '{name}' bodies into context values."""
+    resolved = []
+    for name, method, path, body in routes:
+        if isinstance(body, str):
+            body = context[body.strip('{}')]
+        resolved.append((name, method, path.format(**context), body))
+    return resolved
+
+
+# --- Measurement ---
+
+def summarize(latencies, elapsed, errors):
+    """Percentiles (ms) and throughput for one route."""
+    if not latencies:
+        return {'requests': 0, 'errors': errors}
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 3)
+
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'p50_ms': pct(50),
+        'p90_ms': pct(90),
+        'p99_ms': pct(99),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'rps': round(len(ordered) / elapsed, 1) if elapsed else None,
+    }
+
+
+def bench_in_process(client, routes, requests_per_route, warmup):
+    """Sequential requests through the Flask test client: pure app + framework cost."""
+    results = {}
+    for name, method, path, body in routes:
+        def call():
+            response = client.open(path, method=method, json=body)
+            return response.status_code
+
+        for _ in range(warmup):
+            call()
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(requests_per_route):
+            t0 = time.perf_counter()
+            status = call()
+            latencies.append(time.perf_counter() - t0)
+            if status >= 400:
+                errors += 1
+        results[name] = summarize(latencies, time.perf_counter() - started, errors)
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(workdir, workers, threads, extra_args=(), env=None):
+    port = _free_port()
+    cmd = [
+        sys.executable, '-m', 'gunicorn', 'wsgi:app',
+        '--chdir', workdir, '--pythonpath', BENCH_DIR,
+        '-b', f'127.0.0.1:{port}', '-w', str(workers),
+        '--log-level', 'warning',
+    ] + list(extra_args)
+    config = os.path.join(workdir, 'gunicorn.conf.py')
+    if os.path.exists(config):
+        cmd += ['-c', config]  # The app's own settings, as in production
+    if threads > 1:
+        cmd += ['-k', 'gthread', '--threads', str(threads)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
+                            env=dict(os.environ, **(env or {})))
+    base = f'http://127.0.0.1:{port}'
+
+    import requests
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            requests.get(base + '/', timeout=1)
+            return proc, base
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("gunicorn did not start within 30s")
+
+
+def _session(base, login):
+    import requests
+    session = requests.Session()
+    if login:
+        session.post(base + '/login', data={'password': os.environ['ADMIN_PASSWORD']})
+    return session
+
+
+def bench_load(base, routes, concurrency, duration, login):
+    """`concurrency` clients hammer each route for `duration` seconds over real HTTP."""
+    results = {}
+    for name, method, path, body in routes:
+        sessions = [_session(base, login) for _ in range(concurrency)]
+        for session in sessions[:4]:
+            session.request(method, base + path, json=body)  # Warm connections and caches
+
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def client(session):
+            local, failed = [], 0
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    status = session.request(method, base + path, json=body, timeout=30).status_code
+                except Exception:
+                    status = 599
+                local.append(time.perf_counter() - t0)
+                if status >= 400:
+                    failed += 1
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(s,)) for s in sessions]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        results[name] = summarize(latencies, time.perf_counter() - started, errors[0])
+        results[name]['concurrency'] = concurrency
+    return results
+
+
+# --- Worker: one app per process (every app is a top-level module named `app`) ---
+
+def copy_app(app_name):
+    """
+    A seeded scratch copy of the app, without its data stores or .env, next to
+    a copy of lab_common/ as in the repo. Returns the app's directory; remove
+    it all with remove_copy().
+    """
+    scratch = tempfile.mkdtemp(prefix=f'bench-{app_name}-')
+    ignore = shutil.ignore_patterns('*.db', '*.db-*', '*.lock', '.env', '__pycache__', 'columnar')
+    workdir = os.path.join(scratch, app_name)
+    shutil.copytree(os.path.join(REPO_ROOT, app_name), workdir, ignore=ignore)
+    if os.path.isdir(os.path.join(REPO_ROOT, 'lab_common')):
+        shutil.copytree(os.path.join(REPO_ROOT, 'lab_common'), os.path.join(scratch, 'lab_common'), ignore=ignore)
+    if app_name in SEEDERS:
+        SEEDERS[app_name](workdir)
+    return workdir
+
+
+def remove_copy(workdir):
+    shutil.rmtree(os.path.dirname(workdir), ignore_errors=True)
+
+
+def run_worker(app_name, args):
+    spec = APPS[app_name]
+    workdir = copy_app(app_name)
+    try:
+        sys.path.insert(0, BENCH_DIR)
+        import stubs
+        stubs.install()
+        os.chdir(workdir)
+        sys.path.insert(0, workdir)
+        started = time.perf_counter()
+        module = importlib.import_module('app')
+        import_seconds = time.perf_counter() - started
+
+        client = module.app.test_client()
+        if spec.get('login'):
+            client.post('/login', data={'password': os.environ['ADMIN_PASSWORD']})
+        context = SETUPS[app_name](module, client) if app_name in SETUPS else {}
+        routes = resolve(spec['routes'], context)
+
+        result = {
+            'import_s': round(import_seconds, 3),
+            'in_process': bench_in_process(client, routes, args.requests, args.warmup),
+        }
+        if args.load:
+            proc, base = start_gunicorn(workdir, args.workers, args.threads)
+            try:
+                result['gunicorn'] = bench_load(base, routes, args.concurrency, args.duration, spec.get('login'))
+                result['gunicorn_config'] = {'workers': args.workers, 'threads': args.threads}
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+        return result
+    finally:
+        remove_copy(workdir)
+
+
+# --- Comparison ---
+
+def compare(current, baseline, threshold):
+    """Returns a list of human-readable regressions of `current` against `baseline`."""
+    regressions = []
+    for app_name, app_result in current['apps'].items():
+        base_app = baseline.get('apps', {}).get(app_name, {})
+        for mode in ('in_process', 'gunicorn'):
+            for route, stats in app_result.get(mode, {}).items():
+                old = base_app.get(mode, {}).get(route)
+                if not old:
+                    continue
+                for metric in COMPARED_METRICS:
+                    if metric not in stats or metric not in old:
+                        continue
+                    before, after = old[metric], stats[metric]
+                    if after > before * (1 + threshold) and after - before > MIN_REGRESSION_MS:
+                        growth = f" (+{(after / before - 1) * 100:.0f}%)" if before else ""
+                        regressions.append(f"{app_name} {mode} {route} {metric}: {before}ms -> {after}ms{growth}")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results):
+    print(f"{'app':<22}{'mode':<12}{'route':<14}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'rps':>10}{'err':>6}")
+    for app_name, app_result in results['apps'].items():
+        if 'error' in app_result:
+            print(f"{app_name:<22}FAILED: {app_result['error']}")
+            continue
+        for mode in ('in_process', 'gunicorn'):
+            for route, s in app_result.get(mode, {}).items():
+                print(f"{app_name:<22}{mode:<12}{route:<14}{s.get('p50_ms', '-'):>10}{s.get('p90_ms', '-'):>10}"
+                      f"{s.get('p99_ms', '-'):>10}{s.get('rps', '-'):>10}{s['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', action='append', choices=sorted(APPS), help="repeatable; default: all apps")
+    parser.add_argument('--requests', type=int, default=200, help="in-process requests per route")
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--load', action='store_true', help="also load-test each app under gunicorn")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds of load per route")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers")
+    parser.add_argument('--threads', type=int, default=1, help="gunicorn threads per worker (gthread if > 1)")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed latency growth, 0.25 = 25%%")
+    parser.add_argument('--verbose', action='store_true', help="show app output")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--worker-out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, args)
+        with open(args.worker_out, 'w') as f:
+            json.dump(result, f)
+        return 0
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'settings': {k: getattr(args, k) for k in ('requests', 'warmup', 'load', 'concurrency', 'duration')},
+        'apps': {},
+    }
+    passthrough = [
+        '--requests', str(args.requests), '--warmup', str(args.warmup),
+        '--concurrency', str(args.concurrency), '--duration', str(args.duration),
+        '--workers', str(args.workers), '--threads', str(args.threads),
+    ] + (['--load'] if args.load else [])
+    for app_name in args.app or list(APPS):
+        print(f"Benchmarking {app_name}...")
+        fd, out = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            proc = subprocess.run(
+                [sys.executable, __file__, '--worker', app_name, '--worker-out', out] + passthrough,
+                stdout=None if args.verbose else subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+            )
+            if proc.returncode == 0:
+                with open(out) as f:
+                    results['apps'][app_name] = json.load(f)
+            else:
+                tail = (proc.stdout or '').strip().splitlines()[-1:] or ['see --verbose']
+                results['apps'][app_name] = {'error': tail[0]}
+        finally:
+            os.remove(out)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print_table(results)
+    print(f"Results written to {output}")
+
+    status = 1 if any('error' in r for r in results['apps'].values()) else 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            status = 1
+        else:
+            print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Cold-start benchmarks for the four Flask apps: what a deploy, restart or
+scale-up costs before the first user is served.
+
+For each app (a scratch copy with the stand-ins in stubs.py, as in bench.py):
+
+  import      median time to `import app` in a fresh interpreter
+  first/next  latency of the first and second request to the app's landing
+              route, without and with warm() run beforehand
+  gunicorn    launch-to-first-200 and first-requests latency under gunicorn
+              with the app's gunicorn.conf.py, preloaded and not, plus the
+              proportional set size (PSS) of the master and workers
+
+  python benchmarks/startup.py
+  python benchmarks/startup.py --app website --runs 9 --workers 4
+
+Results are written as JSON (default benchmarks/results/startup-<timestamp>.json).
+Apps without warm() (older commits) are measured as they are.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+import bench
+
+# First request per app: the route a visitor (or a load balancer check) hits first
+LANDING = {
+    'website': '/',
+    'mba_portfolio': '/',
+    'market_time_machine': '/',
+    'ai_news_bot': '/api/news',
+}
+FOLLOW_UP_REQUESTS = 10  # After the first 200; with several workers some are still cold
+
+
+def probe(app_name, workdir, warm):
+    """Runs in a fresh interpreter: import, optionally warm(), then two requests."""
+    sys.path.insert(0, bench.BENCH_DIR)
+    import stubs
+    stubs.install()
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+
+    started = time.perf_counter()
+    import app as module
+    result = {'import_s': time.perf_counter() - started}
+    if warm:
+        started = time.perf_counter()
+        getattr(module, 'warm', lambda: None)()
+        result['warm_s'] = time.perf_counter() - started
+
+    client = module.app.test_client()
+    if bench.APPS[app_name].get('login'):
+        client.post('/login', data={'password': os.environ['ADMIN_PASSWORD']})
+    for key in ('first_ms', 'next_ms'):
+        started = time.perf_counter()
+        status = client.get(LANDING[app_name]).status_code
+        result[key] = (time.perf_counter() - started) * 1000
+        if status >= 400:
+            raise RuntimeError(f"{LANDING[app_name]} returned {status}")
+    return result
+
+
+def run_probe(app_name, workdir, warm):
+    fd, out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        proc = subprocess.run(
+            [sys.executable, __file__, '--probe', app_name, '--workdir', workdir, '--probe-out', out]
+            + (['--warm'] if warm else []),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        if proc.returncode != 0:
+            tail = proc.stdout.strip().splitlines()[-1:] or ['probe failed']
+            raise RuntimeError(tail[0])
+        with open(out) as f:
+            return json.load(f)
+    finally:
+        os.remove(out)
+
+
+def _median(runs, key, scale=1):
+    values = [r[key] for r in runs if key in r]
+    return round(statistics.median(values) * scale, 1) if values else None
+
+
+def _pss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def run_gunicorn(app_name, workdir, preload, workers):
+    import requests
+    session = requests.Session()
+    if bench.APPS[app_name].get('login'):
+        login = lambda: session.post(base + '/login', data={'password': os.environ['ADMIN_PASSWORD']})
+    else:
+        login = lambda: None
+
+    launched = time.perf_counter()
+    proc, base = bench.start_gunicorn(workdir, workers, 1, env={'GUNICORN_PRELOAD': '1' if preload else '0'})
+    try:
+        # start_gunicorn returns once the socket answers; wait for the landing route itself
+        while True:
+            login()
+            started = time.perf_counter()
+            response = session.get(base + LANDING[app_name], timeout=30)
+            first_ms = (time.perf_counter() - started) * 1000
+            if response.status_code == 200:
+                break
+            if time.perf_counter() - launched > 60:
+                raise RuntimeError(f"no 200 from {LANDING[app_name]} within 60s")
+            time.sleep(0.05)
+        ready_s = time.perf_counter() - launched
+
+        latencies = []
+        for _ in range(FOLLOW_UP_REQUESTS):
+            fresh = requests.Session()  # New connection, so any worker may take it
+            if bench.APPS[app_name].get('login'):
+                fresh.cookies.update(session.cookies)
+            started = time.perf_counter()
+            fresh.get(base + LANDING[app_name], timeout=30)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        time.sleep(0.5)  # Let background threads settle before reading memory
+        pss = {'master': _pss_kb(proc.pid), 'workers': [_pss_kb(p) for p in _children(proc.pid)]}
+        if pss['master'] is not None and None not in pss['workers']:
+            pss['total_mb'] = round((pss['master'] + sum(pss['workers'])) / 1024, 1)
+        return {
+            'ready_s': round(ready_s, 3),
+            'first_ms': round(first_ms, 1),
+            'follow_up_max_ms': round(max(latencies), 1),
+            'follow_up_p50_ms': round(statistics.median(latencies), 1),
+            'pss_kb': pss,
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def bench_app(app_name, args):
+    workdir = bench.copy_app(app_name)
+    try:
+        # One unmeasured first boot creates the data stores, so every measured run is a restart
+        run_probe(app_name, workdir, False)
+        result = {}
+        for warm in (False, True):
+            runs = [run_probe(app_name, workdir, warm) for _ in range(args.runs)]
+            result['warm' if warm else 'cold'] = {
+                'import_ms': _median(runs, 'import_s', 1000),
+                'warm_ms': _median(runs, 'warm_s', 1000),
+                'first_ms': _median(runs, 'first_ms'),
+                'next_ms': _median(runs, 'next_ms'),
+            }
+        if args.gunicorn:
+            for preload in (False, True):
+                runs = [run_gunicorn(app_name, workdir, preload, args.workers) for _ in range(args.gunicorn_runs)]
+                best = sorted(runs, key=lambda r: r['ready_s'])[len(runs) // 2]  # Median run, whole
+                result['preload' if preload else 'no_preload'] = best
+        return result
+    finally:
+        bench.remove_copy(workdir)
+
+
+def print_table(results):
+    print(f"{'app':<22}{'mode':<12}{'import ms':>10}{'warm ms':>10}{'1st ms':>10}{'2nd ms':>10}")
+    for app_name, r in results['apps'].items():
+        if 'error' in r:
+            print(f"{app_name:<22}FAILED: {r['error']}")
+            continue
+        for mode in ('cold', 'warm'):
+            s = r[mode]
+            print(f"{app_name:<22}{mode:<12}{s['import_ms']:>10}{s['warm_ms'] if s['warm_ms'] is not None else '-':>10}"
+                  f"{s['first_ms']:>10}{s['next_ms']:>10}")
+    if results['settings']['gunicorn']:
+        print()
+        print(f"{'app':<22}{'gunicorn':<12}{'ready s':>10}{'1st ms':>10}{'max ms':>10}{'PSS MB':>10}")
+        for app_name, r in results['apps'].items():
+            for mode in ('no_preload', 'preload'):
+                if mode in r:
+                    s = r[mode]
+                    print(f"{app_name:<22}{mode:<12}{s['ready_s']:>10}{s['first_ms']:>10}"
+                          f"{s['follow_up_max_ms']:>10}{s['pss_kb'].get('total_mb', '-'):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', action='append', choices=sorted(bench.APPS), help="repeatable; default: all apps")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument('--no-gunicorn', dest='gunicorn', action='store_false', help="skip the gunicorn runs")
+    parser.add_argument('--gunicorn-runs', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/startup-<timestamp>.json)")
+    parser.add_argument('--probe', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--warm', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--probe-out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        result = probe(args.probe, args.workdir, args.warm)
+        with open(args.probe_out, 'w') as f:
+            json.dump(result, f)
+        return 0
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': bench._git_commit(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'settings': {k: getattr(args, k) for k in ('runs', 'gunicorn', 'gunicorn_runs', 'workers')},
+        'apps': {},
+    }
+    os.environ.setdefault('ADMIN_PASSWORD', 'benchmark')  # What stubs.install() gives the apps
+    status = 0
+    for app_name in args.app or list(bench.APPS):
+        print(f"Measuring {app_name}...")
+        try:
+            results['apps'][app_name] = bench_app(app_name, args)
+        except Exception as e:
+            results['apps'][app_name] = {'error': str(e)}
+            status = 1
+
+    output = args.output or os.path.join(bench.RESULTS_DIR, 'startup-' + time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print_table(results)
+    print(f"Results written to {output}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
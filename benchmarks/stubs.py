@@ -0,0 +1,172 @@
+import io
+import os
+import sys
+import random
+import time
+import types
+import smtplib
+from email.utils import formatdate
+
+import requests
+from requests.adapters import BaseAdapter
+
+# --- Local Stand-ins ---
+# Everything the apps normally reach over the network, answered in-process so
+# a benchmark measures our code rather than YouTube, Gemini or someone's RSS.
+# install() must run before the app module is imported (the apps read their
+# credentials from the environment at import). BENCH_STUB_LATENCY adds a fixed
+# delay (seconds) to every stand-in call, to model a slow upstream.
+
+FEED_ITEMS = 40
+PLAYLIST_SIZE = 9
+SYNDICATED_EVERY = 8  # Every 8th story runs in every feed, so the dedupe has groups to merge
+
+# Stories are assembled from these, seeded per story, so each one scores and
+# shingles differently instead of the whole feed collapsing into one article
+COMPANIES = ['OpenAI', 'Anthropic', 'DeepMind', 'Nvidia', 'Mistral', 'Hugging Face', 'Meta', 'Microsoft']
+ACTIONS = ['releases', 'open-sources', 'delays', 'prices', 'audits', 'expands', 'retires', 'previews']
+PRODUCTS = ['language model', 'agent framework', 'robotics stack', 'vision model',
+            'inference chip', 'training dataset', 'chatbot', 'benchmark suite', 'weather app', 'spreadsheet']
+WORDS = [a + b for a in ('ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'to', 'vi', 'ze', 'po')
+         for b in ('ban', 'cor', 'dit', 'fen', 'gal', 'hom', 'lis', 'mur', 'ter', 'vos')]
+
+
+def _latency():
+    delay = float(os.environ.get('BENCH_STUB_LATENCY', 0))
+    if delay:
+        time.sleep(delay)
+
+
+def render_feed(url, items=FEED_ITEMS):
+    """An RSS 2.0 document with `items` AI stories from the last day, newest first."""
+    now = time.time()
+    entries = []
+    for i in range(items):
+        published = formatdate(now - i * 1800, usegmt=True)
+        title, body = _story(f"story-{i}" if i % SYNDICATED_EVERY == 0 else f"{url}#{i}")
+        entries.append(
+            f"<item><title>{title}</title>"
+            f"<link>{url.rstrip('/')}/story-{i}</link>"
+            f"<description>&lt;p&gt;{body}&lt;/p&gt;</description>"
+            f"<pubDate>{published}</pubDate></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>Stand-in feed {url}</title><link>{url}</link>"
+        + "".join(entries) +
+        "</channel></rss>"
+    ).encode('utf-8')
+
+
+def _story(key):
+    """(title, body) of one made-up story, the same wherever `key` appears."""
+    rng = random.Random(key)
+    title = f"{rng.choice(COMPANIES)} {rng.choice(ACTIONS)} {rng.choice(PRODUCTS)} {rng.choice(WORDS).title()}"
+    body = f"{title} for machine learning teams. " + ' '.join(rng.choices(WORDS, k=60)) + '.'
+    return title, body
+
+
+class FeedAdapter(BaseAdapter):
+    """requests transport that answers every remote URL with a generated feed."""
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        _latency()
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response.headers['Content-Type'] = 'application/rss+xml'
+        response.raw = io.BytesIO(render_feed(request.url))
+        return response
+
+    def close(self):
+        pass
+
+
+_real_get_adapter = requests.Session.get_adapter
+
+
+def _get_adapter(self, url):
+    # Local servers (e.g. gunicorn under load) still go over the real network stack
+    if url.startswith(('http://127.0.0.1', 'http://localhost')):
+        return _real_get_adapter(self, url)
+    return FeedAdapter()
+
+
+class YoutubeDL:
+    """yt_dlp.YoutubeDL stand-in: every playlist has PLAYLIST_SIZE flat entries."""
+    def __init__(self, opts=None):
+        self.opts = opts or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=False):
+        _latency()
+        count = self.opts.get('playlistend', PLAYLIST_SIZE)
+        return {'entries': [{'id': f'bench{i:07d}'} for i in range(count)]}
+
+
+class GenerativeModel:
+    """google.generativeai.GenerativeModel stand-in; echoes a trimmed prompt."""
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        _latency()
+        text = ' '.join(str(prompt).split())[-400:]
+        if stream:
+            words = text.split(' ')
+            return [types.SimpleNamespace(text=' '.join(words[i:i + 8]) + ' ')
+                    for i in range(0, len(words), 8)]
+        return types.SimpleNamespace(text=text)
+
+
+class SMTP:
+    """smtplib.SMTP stand-in that accepts every message."""
+    sent = 0
+
+    def __init__(self, host='', port=0, timeout=None, **kwargs):
+        _latency()
+
+    def starttls(self, *args, **kwargs):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def sendmail(self, from_addr, to_addrs, msg, *args, **kwargs):
+        SMTP.sent += 1
+        return {}
+
+    def noop(self):
+        return (250, b'OK')
+
+    def quit(self):
+        pass
+
+    close = quit
+
+
+def install():
+    """Swaps the stand-ins in for the network clients and sets benchmark credentials."""
+    sys.modules['yt_dlp'] = types.SimpleNamespace(YoutubeDL=YoutubeDL)
+
+    genai = types.ModuleType('google.generativeai')
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = GenerativeModel
+    google = sys.modules.get('google') or types.ModuleType('google')
+    google.generativeai = genai
+    sys.modules['google'] = google
+    sys.modules['google.generativeai'] = genai
+
+    requests.Session.get_adapter = _get_adapter
+    smtplib.SMTP = SMTP
+
+    os.environ.setdefault('MUSIC_CHANNEL_ID', 'UCbenchmark')
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+    os.environ.setdefault('ADMIN_PASSWORD', 'benchmark')
+    os.environ.setdefault('EMAIL_ADDRESS', 'bench@localhost')
+    os.environ.setdefault('EMAIL_PASSWORD', 'benchmark')
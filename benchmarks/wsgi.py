@@ -0,0 +1,7 @@
+# gunicorn entry point for load runs: stand-ins first, then the app in the cwd
+# (bench.py starts gunicorn with --chdir <app copy> --pythonpath benchmarks/).
+import stubs
+
+stubs.install()
+
+from app import app  # noqa: E402
@@ -0,0 +1,5 @@
+"""
+Code shared by the apps in the lab. Each app puts the repo root on sys.path
+(see its instrumentation.py), except website/, which deploys on its own and
+carries a copy of this package (kept identical by website/tests).
+"""
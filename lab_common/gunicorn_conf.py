@@ -0,0 +1,39 @@
+# Gunicorn settings shared by every app in the lab. Each app's gunicorn.conf.py
+# re-exports them; gunicorn reads that file from the working directory
+# (`gunicorn app:app`), or from `-c <path>` when launched from elsewhere.
+#
+# The app module is imported once in the master, and its warm() loads data and
+# compiles templates before any worker exists, so workers fork with all of it
+# already in memory (shared copy-on-write) and the first request after a deploy
+# or scale-up is as fast as the rest. Threads don't survive a fork, so each
+# worker then calls start_background() for its own.
+# GUNICORN_PRELOAD=0 imports and warms in every worker instead.
+import gc
+import os
+import sys
+
+__all__ = ['preload_app', 'when_ready', 'post_worker_init']
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+
+def _app_module(process):
+    # The module that created the Flask app, whatever the entry point (app:app, wsgi:app...)
+    return sys.modules[process.app.wsgi().import_name]
+
+
+def when_ready(server):
+    # Master, sockets bound, no workers yet: nothing is served until this returns
+    if server.cfg.preload_app:
+        _app_module(server).warm()
+        gc.freeze()  # Keeps the collector from writing to (and so copying) the shared pages
+
+
+def post_worker_init(worker):
+    # After the worker's signal handlers are in place, so a shutdown during warm-up isn't lost
+    module = _app_module(worker)
+    if not worker.cfg.preload_app:
+        module.warm()
+    start = getattr(module, 'start_background', None)
+    if start is not None:
+        start()
@@ -0,0 +1,75 @@
+import os
+import hashlib
+
+from flask import Response, request
+
+# --- HTTP Caching ---
+# Rendered pages served with strong ETags (a revisit costs a bodiless 304),
+# and static files fingerprinted by content so their URLs can be cached for
+# good. Shared by the apps with public pages (website, mba_portfolio).
+
+STATIC_MAX_AGE = 31536000  # One year; a changed file gets a new ?v= URL
+
+__all__ = ['HttpCache', 'STATIC_MAX_AGE']
+
+
+class HttpCache:
+    """
+    Per-app page and static-file caches. `url_for('static', ...)` gets
+    ?v=<content hash>, and those responses are cached for a year; everything
+    else is revalidated on each view, so updates still appear instantly.
+    """
+    def __init__(self, app):
+        self.app = app
+        self._pages = {}            # name -> (version, body, etag)
+        self._static_versions = {}  # filename -> (mtime_ns, hash)
+        app.url_defaults(self._fingerprint_static)
+        app.after_request(self._add_header)
+
+    def page(self, name, version, render):
+        """Serves `render()` from the cache while `version` holds, with a strong ETag and 304s."""
+        cached = self._pages.get(name)
+        if cached is None or cached[0] != version:
+            body = render().encode('utf-8')
+            cached = (version, body, hashlib.sha1(body).hexdigest())
+            self._pages[name] = cached
+        _, body, etag = cached
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='text/html')
+        response.set_etag(etag)
+        return response
+
+    def static_version(self, filename):
+        """Short content hash of a static file, recomputed only when its mtime changes."""
+        path = os.path.join(self.app.static_folder, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._static_versions.get(filename)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'rb') as f:
+                cached = (mtime, hashlib.file_digest(f, 'sha1').hexdigest()[:12])
+            self._static_versions[filename] = cached
+        return cached[1]
+
+    def warm(self):
+        """Hashes every static file up front, for warm() before traffic arrives."""
+        for root, _, files in os.walk(self.app.static_folder):
+            for name in files:
+                self.static_version(os.path.relpath(os.path.join(root, name), self.app.static_folder))
+
+    def _fingerprint_static(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            version = self.static_version(values['filename'])
+            if version:
+                values['v'] = version
+
+    def _add_header(self, response):
+        if request.endpoint == 'static' and request.args.get('v'):
+            response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+        elif 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
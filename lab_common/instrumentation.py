@@ -0,0 +1,354 @@
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import bisect
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import Response, g, request, before_render_template, template_rendered
+
+# --- Instrumentation ---
+# Request latency per route, spans around known-slow calls, a Prometheus
+# /metrics endpoint and an opt-in sampling profiler for slow requests.
+# Shared by every app in the lab; each app's instrumentation.py re-exports it.
+#
+#   METRICS_DIR=dir       share metrics between gunicorn workers through files in dir
+#   METRICS_TOKEN=secret  require "Authorization: Bearer secret" on /metrics
+#   PROFILE_SLOW_MS=500   sample request stacks; dump requests slower than this
+#   PROFILE_DIR=profiles  where the folded stacks go (flamegraph.pl / speedscope)
+#   PROFILE_INTERVAL_MS=5 sampling period
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+FLUSH_INTERVAL = 5  # Seconds between writes of this worker's metrics to METRICS_DIR
+STALE_AFTER = 3 * FLUSH_INTERVAL  # A live worker rewrites its file more often than this
+
+__all__ = ['METRICS', 'Metrics', 'SlowRequestProfiler', 'instrument', 'span']
+
+HELP = {
+    'http_request_duration_seconds': ('histogram', 'Time to build each response, by route.'),
+    'http_requests_total': ('counter', 'Responses by route and status.'),
+    'span_duration_seconds': ('histogram', 'Time spent in instrumented calls.'),
+    'span_errors_total': ('counter', 'Instrumented calls that raised.'),
+}
+
+
+class Metrics:
+    """
+    Counters and fixed-bucket histograms, keyed by (name, labels).
+    Everything is per process; with METRICS_DIR each worker also writes its
+    totals to a file there, and /metrics adds up the files of live workers.
+    A worker removes its file when it exits; files of workers that died
+    without doing so are skipped once stale and deleted once their pid is gone.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._reset()
+        if directory:
+            atexit.register(self._remove_own)
+            if hasattr(os, 'register_at_fork'):
+                # A forked worker starts from zero; the master's counts stay in the master's file
+                os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._next_flush = 0
+        self._written = None   # Path of the file this process last wrote
+        self._heartbeat_pid = None
+
+    def inc(self, name, labels=(), amount=1):
+        with self._lock:
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self._maybe_flush()
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            key = (name, labels)
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0, 0]
+            h[bisect.bisect_left(BUCKETS, value)] += 1
+            h[-2] += value
+            h[-1] += 1
+        self._maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(h)] for (name, labels), h in self._histograms.items()],
+            }
+
+    def _path(self):
+        return os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+
+    def _maybe_flush(self, force=False):
+        if not self.directory or (not force and time.time() < self._next_flush):
+            return
+        self._next_flush = time.time() + FLUSH_INTERVAL
+        self._start_heartbeat()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, self._path())
+            self._written = self._path()
+        except OSError as e:
+            print(f"Could not write metrics: {e}")
+
+    def _start_heartbeat(self):
+        # Keeps an idle worker's file fresh, so collect() can tell it from a dead one's
+        with self._lock:
+            if self._heartbeat_pid == os.getpid():
+                return
+            self._heartbeat_pid = os.getpid()
+        threading.Thread(target=self._heartbeat, name='metrics-flush', daemon=True).start()
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self._maybe_flush(force=True)
+
+    def _remove_own(self):
+        if self._written == self._path():
+            try:
+                os.remove(self._written)
+            except OSError:
+                pass
+
+    def collect(self):
+        """Totals over this process and, with METRICS_DIR, every other worker's last flush."""
+        snapshots = [self.snapshot()]
+        if self.directory and os.path.isdir(self.directory):
+            own = os.path.basename(self._path())
+            for filename in os.listdir(self.directory):
+                if not (filename.startswith('metrics-') and filename.endswith('.json')) or filename == own:
+                    continue
+                path = os.path.join(self.directory, filename)
+                try:
+                    if not _pid_alive(filename[len('metrics-'):-len('.json')]):
+                        os.remove(path)  # Killed before its exit handler ran
+                        continue
+                    if time.time() - os.stat(path).st_mtime > STALE_AFTER:
+                        continue  # Its pid now belongs to some other process
+                    with open(path, 'r') as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    pass  # Replaced or half-written; the next scrape sees it
+
+        counters, histograms = {}, {}
+        for snap in snapshots:
+            for name, labels, value in snap['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, h in snap['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                total = histograms.setdefault(key, [0] * len(h))
+                for i, v in enumerate(h):
+                    total[i] += v
+        return counters, histograms
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)."""
+        self._maybe_flush(force=True)
+        counters, histograms = self.collect()
+        by_name = {}
+        for (name, labels), value in sorted(counters.items()):
+            by_name.setdefault(name, []).append(_sample(name, labels, value))
+        for (name, labels), h in sorted(histograms.items()):
+            lines = by_name.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), h):
+                cumulative += count
+                lines.append(_sample(name + '_bucket', labels + (('le', str(bound)),), cumulative))
+            lines.append(_sample(name + '_sum', labels, h[-2]))
+            lines.append(_sample(name + '_count', labels, h[-1]))
+
+        out = []
+        for name in sorted(by_name):
+            kind, text = HELP.get(name, ('untyped', name))
+            out.append(f"# HELP {name} {text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(by_name[name])
+        return '\n'.join(out) + '\n'
+
+
+def _pid_alive(pid):
+    if os.name != 'posix':
+        return True  # os.kill(pid, 0) would terminate it on Windows; the mtime check still applies
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass  # Exists, owned by someone else
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name, labels, value):
+    if labels:
+        name += '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+    return f"{name} {value}"
+
+
+METRICS = Metrics(os.environ.get('METRICS_DIR'))
+
+
+@contextmanager
+def span(name):
+    """Times a block as span_duration_seconds{span=name}; errors also count in span_errors_total."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        METRICS.inc('span_errors_total', (('span', name),))
+        raise
+    finally:
+        METRICS.observe('span_duration_seconds', (('span', name),), time.perf_counter() - start)
+
+
+# --- Sampling Profiler ---
+
+class SlowRequestProfiler:
+    """
+    While enabled, a background thread samples the stack of every thread
+    that is serving a request. Requests slower than `threshold` seconds are
+    written to `directory` as folded stacks ("outer;inner;leaf count" per
+    line), which flamegraph.pl and speedscope read directly.
+    """
+    def __init__(self, threshold, directory='profiles', interval=0.005):
+        self.threshold = threshold
+        self.directory = directory
+        self.interval = interval
+        self._active = {}  # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name='profiler', daemon=True)
+                self._thread.start()
+
+    def end(self, label, duration):
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+        if not stacks or duration < self.threshold:
+            return
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_') or 'request'
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{duration * 1000:.0f}ms.folded")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'w') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            print(f"Slow request ({duration * 1000:.0f}ms): profile in {path}")
+        except OSError as e:
+            print(f"Could not write profile: {e}")
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for ident, stacks in active:
+                frame = frames.get(ident)
+                if frame is not None:
+                    stacks[_fold(frame)] += 1
+
+
+def _fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _profiler_from_env():
+    slow_ms = os.environ.get('PROFILE_SLOW_MS')
+    if not slow_ms:
+        return None
+    return SlowRequestProfiler(
+        float(slow_ms) / 1000,
+        directory=os.environ.get('PROFILE_DIR', 'profiles'),
+        interval=float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000,
+    )
+
+
+# --- Flask ---
+
+_renders = threading.local()
+
+
+def instrument(app, profiler=None):
+    """
+    Adds request timing, Jinja render spans and GET /metrics to `app`.
+    Latency is measured to the end of the view, so for streamed responses
+    it is the time to the first byte. `profiler` defaults to one configured
+    from PROFILE_* (None, i.e. off, unless PROFILE_SLOW_MS is set).
+    """
+    profiler = profiler or _profiler_from_env()
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        if profiler is not None:
+            profiler.begin()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('request_start', None)
+        if start is None:
+            return response
+        duration = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'  # Templates keep label sets small
+        labels = (('route', route), ('method', request.method))
+        METRICS.observe('http_request_duration_seconds', labels, duration)
+        METRICS.inc('http_requests_total', labels + (('status', str(response.status_code)),))
+        if profiler is not None:
+            profiler.end(f"{request.method} {route}", duration)
+        return response
+
+    def render_started(sender, template, context, **extra):
+        stack = getattr(_renders, 'stack', None)
+        if stack is None:
+            stack = _renders.stack = []
+        stack.append(time.perf_counter())
+
+    def render_finished(sender, template, context, **extra):
+        stack = getattr(_renders, 'stack', None)
+        if stack:
+            METRICS.observe('span_duration_seconds', (('span', f"render:{template.name}"),),
+                            time.perf_counter() - stack.pop())
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+    @app.route('/metrics')
+    def metrics():
+        token = os.environ.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            return Response("Unauthorized\n", status=401, mimetype='text/plain')
+        response = Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    return app
@@ -1,60 +1,29 @@
 import os
 import json
-from flask import Flask, render_template, jsonify, request
-from abc import ABC, abstractmethod
+import math
+import time
+import numpy as np
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
+from providers import JsonDataProvider, CachedDataProvider
+from columnar import ColumnarDataProvider
+from engine import AllocationError, INITIAL_CAPITAL, MAX_LEVERAGE
+from sampling import METHODS, shape_series
+from timeline import TimelineCache
+import optimizer
+from instrumentation import instrument
 
 app = Flask(__name__)
-
-# --- Scalable Data Layer ---
-class DataProvider(ABC):
-    """
-    Abstract Base Class for Data Fetching.
-    Allows easy swapping between local JSON (MVP) and Paid APIs (Scale).
-    """
-    @abstractmethod
-    def get_scenarios(self):
-        """Returns list of available eras."""
-        pass
-
-    @abstractmethod
-    def get_era_data(self, era_id):
-        """Returns detailed simulation data for a specific era."""
-        pass
-
-class JsonDataProvider(DataProvider):
-    """MVP: Loads data from local JSON files."""
-    def __init__(self, data_path='data/scenarios.json'):
-        self.data_path = os.path.join(os.path.dirname(__file__), data_path)
-
-    def _load_data(self):
-        with open(self.data_path, 'r') as f:
-            return json.load(f)
-
-    def get_scenarios(self):
-        data = self._load_data()
-        # Return summary list for the timeline
-        return [
-            {
-                "id": era["id"],
-                "name": era["name"],
-                "year_start": era["year_start"],
-                "year_end": era["year_end"],
-                "description": era["description"]
-            }
-            for era in data["eras"]
-        ]
-
-    def get_era_data(self, era_id):
-        data = self._load_data()
-        for era in data["eras"]:
-            if era["id"] == era_id:
-                return era
-        return None
-
-# Future: class PolygonApiProvider(DataProvider): ...
+instrument(app)
 
 # Initialize Provider (Swap this line to scale later!)
-data_provider = JsonDataProvider()
+if os.environ.get('MARKET_DATA_FORMAT') == 'columnar':
+    # Large histories: memory-mapped price matrices (build with `python columnar.py`)
+    data_provider = ColumnarDataProvider()
+else:
+    data_provider = CachedDataProvider(JsonDataProvider())
+
+# Per-era event index, normalized series, statistics and Backtester, built once per data version
+timelines = TimelineCache(data_provider)
 
 # --- Routes ---
 @app.route('/')
@@ -71,14 +40,270 @@ def simulate(era_id):
         return "Era not found", 404
     return render_template('simulate.html', era=data)
 
+MAX_POINTS = 10000
+MAX_STREAM_INTERVAL = 5.0  # Seconds between streamed steps
+
 @app.route('/api/data/<era_id>')
 def get_data(era_id):
-    """JSON API for Chart.js"""
-    data = data_provider.get_era_data(era_id)
-    if not data:
+    """
+    JSON API for Chart.js.
+
+    With no query string the whole era is served pre-serialized, with ETag
+    revalidation. Optional parameters bound the payload:
+      tickers=A,B        only these assets
+      start=, end=       step index or timestamp label (end inclusive)
+      points=N           downsample to ~N points (method=lttb|minmax)
+      stream=ndjson|sse  send steps one at a time (interval= seconds apart)
+    """
+    if not request.args:
+        cached = data_provider.get_era_json(era_id)
+        if not cached:
+            return jsonify({"error": "Era not found"}), 404
+        body, etag = cached
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response
+
+    try:
+        era = build_window(era_id, request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if era is None:
         return jsonify({"error": "Era not found"}), 404
-    return jsonify(data)
+
+    stream = request.args.get('stream')
+    if stream:
+        if stream not in ('ndjson', 'sse'):
+            return jsonify({"error": "stream must be ndjson or sse"}), 400
+        interval = request.args.get('interval', 0, type=float)
+        if not math.isfinite(interval):  # NaN would slip through the clamp and fail mid-stream
+            return jsonify({"error": "interval must be a finite number of seconds"}), 400
+        return stream_era(era, stream, min(max(interval, 0), MAX_STREAM_INTERVAL))
+    return jsonify(era)
+
+def _step_index(value, timestamps, default):
+    """Resolves a start/end parameter given as a step index or a timestamp label."""
+    if value is None or value == '':
+        return default
+    if value.lstrip('-').isdigit():
+        return int(value)
+    try:
+        return timestamps.index(value)
+    except ValueError:
+        raise ValueError(f"Unknown timestamp: {value}")
+
+def build_window(era_id, args):
+    """Era data cut to the requested tickers/time range and downsampled to `points`."""
+    matrix = data_provider.get_price_matrix(era_id)
+    if not matrix:
+        return None
+    tickers, timestamps, prices = matrix
+    timestamps = list(timestamps)
+
+    if args.get('tickers'):
+        wanted = args['tickers'].split(',')
+        unknown = [t for t in wanted if t not in tickers]
+        if unknown:
+            raise ValueError(f"Unknown tickers: {', '.join(unknown)}")
+        selected = wanted
+    else:
+        selected = list(tickers)
+    columns = [tickers.index(t) for t in selected]
+
+    start = _step_index(args.get('start'), timestamps, 0)
+    stop = _step_index(args.get('end'), timestamps, len(timestamps) - 1) + 1
+    if not 0 <= start < stop <= len(timestamps):
+        raise ValueError("Empty or out-of-range time window")
+
+    # Slicing rows first keeps memory-mapped providers from reading outside the window
+    rows = np.asarray(prices[start:stop])[:, columns]
+    window_ts = timestamps[start:stop]
+
+    era = data_provider.get_window(era_id, 0, 0, selected)  # Metadata only, no prices
+    in_window = set(window_ts)
+    events = [e for e in era["events"] if e["date"] in in_window]
+
+    points = args.get('points', type=int)
+    if points:
+        method = METHODS.get(args.get('method', 'lttb'))
+        if method is None:
+            raise ValueError("method must be lttb or minmax")
+        keep = method(shape_series(rows), min(max(points, 2), MAX_POINTS))
+        # Event steps always survive, so the replay can still show them
+        event_steps = [step - start for step in timelines.get(era_id)["events"] if start <= step < stop]
+        keep = np.union1d(keep, event_steps).astype(int)
+        rows = rows[keep]
+        window_ts = [window_ts[i] for i in keep]
+
+    era["events"] = events
+    era["market_data"] = {
+        "timestamps": window_ts,
+        "prices": {t: rows[:, j].tolist() for j, t in enumerate(selected)},
+    }
+    return era
+
+def stream_era(era, fmt, interval):
+    """Streams an era as a metadata record followed by one record per step."""
+    market = era.pop("market_data")
+    events = {e["date"]: e for e in era["events"]}
+    tickers = list(market["prices"])
+
+    def encode(kind, payload):
+        if fmt == 'sse':
+            return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+        payload = dict(payload, type=kind)
+        return json.dumps(payload) + "\n"
+
+    def generate():
+        yield encode("meta", dict(era, tickers=tickers, steps=len(market["timestamps"])))
+        for i, ts in enumerate(market["timestamps"]):
+            step = {
+                "step": i,
+                "timestamp": ts,
+                "prices": {t: market["prices"][t][i] for t in tickers},
+            }
+            if ts in events:
+                step["event"] = events[ts]
+            yield encode("step", step)
+            if interval:
+                time.sleep(interval)
+        yield encode("end", {"steps": len(market["timestamps"])})
+
+    mimetype = 'text/event-stream' if fmt == 'sse' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let proxies pass steps through immediately
+    return response
+
+@app.route('/api/era/<era_id>/summary')
+def era_summary(era_id):
+    """
+    Compiled era for the replay: timestamps, events keyed by step, each
+    asset's prices normalized to its first price, and peak / trough /
+    drawdown / volatility stats per asset and for the era as a whole.
+    """
+    try:
+        cached = timelines.get_json(era_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not cached:
+        return jsonify({"error": "Era not found"}), 404
+    body, etag = cached
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/simulate/<era_id>', methods=['POST'])
+def run_simulation(era_id):
+    """
+    Authoritative portfolio run for one allocation.
+    Body: {"allocation": {"TICKER": weight, ...}, "capital": 10000}
+    Weights are fractions of capital; negative means short.
+    """
+    try:
+        backtester = timelines.backtester(era_id)
+    except ValueError as e:  # e.g. a zero starting price
+        return jsonify({"error": str(e)}), 400
+    if backtester is None:
+        return jsonify({"error": "Era not found"}), 404
+
+    body = request.get_json(silent=True) or {}
+    allocation = body.get("allocation")
+    if not isinstance(allocation, dict):
+        return jsonify({"error": "allocation must be an object of ticker -> weight"}), 400
+    try:
+        capital = float(body.get("capital", INITIAL_CAPITAL))
+        result = backtester.run(allocation, capital=capital)
+    except (AllocationError, TypeError, ValueError, OverflowError) as e:
+        return jsonify({"error": str(e)}), 400
+    result["era_id"] = era_id
+    return jsonify(result)
+
+@app.route('/api/optimize/<era_id>', methods=['POST'])
+def run_optimizer(era_id):
+    """
+    Batch search over allocations.
+    Body: {"mode": "random"|"grid", "samples": 100000, "step": 0.25,
+           "tickers": [...], "max_leverage": 2.0, "allow_short": true,
+           "risk": "volatility"|"drawdown", "top": 5, "seed": 42}
+    Returns the efficient frontier, best/worst portfolios and drawdown stats.
+    """
+    try:
+        backtester = timelines.backtester(era_id)
+    except ValueError as e:  # e.g. a zero starting price
+        return jsonify({"error": str(e)}), 400
+    if backtester is None:
+        return jsonify({"error": "Era not found"}), 404
+
+    body = request.get_json(silent=True) or {}
+    allow_short = body.get("allow_short", True)
+    if not isinstance(allow_short, bool):  # bool("false") would be True
+        return jsonify({"error": "allow_short must be true or false"}), 400
+    try:
+        result = optimizer.optimize(
+            backtester,
+            tickers=body.get("tickers"),
+            mode=body.get("mode", "random"),
+            samples=int(body.get("samples", 10000)),
+            step=float(body.get("step", 0.25)),
+            max_leverage=float(body.get("max_leverage", MAX_LEVERAGE)),
+            allow_short=allow_short,
+            risk=body.get("risk", "volatility"),
+            top=int(body.get("top", 5)),
+            seed=body.get("seed"),
+        )
+    except (AllocationError, TypeError, ValueError, OverflowError) as e:
+        return jsonify({"error": str(e)}), 400
+    result["era_id"] = era_id
+    return jsonify(result)
+
+@app.route('/api/stress/<era_id>', methods=['POST'])
+def run_stress_test(era_id):
+    """
+    Monte Carlo stress test of one allocation over bootstrapped histories.
+    Body: {"allocation": {"TICKER": weight, ...}, "paths": 10000, "seed": 42}
+    """
+    try:
+        backtester = timelines.backtester(era_id)
+    except ValueError as e:  # e.g. a zero starting price
+        return jsonify({"error": str(e)}), 400
+    if backtester is None:
+        return jsonify({"error": "Era not found"}), 404
+
+    body = request.get_json(silent=True) or {}
+    allocation = body.get("allocation")
+    if not isinstance(allocation, dict):
+        return jsonify({"error": "allocation must be an object of ticker -> weight"}), 400
+    try:
+        result = optimizer.stress_test(
+            backtester, allocation,
+            paths=int(body.get("paths", 10000)), seed=body.get("seed")
+        )
+    except (AllocationError, TypeError, ValueError, OverflowError) as e:
+        return jsonify({"error": str(e)}), 400
+    result["era_id"] = era_id
+    return jsonify(result)
+
+# --- Startup ---
+def warm():
+    """
+    Loads every era and compiles its timeline before any traffic is accepted.
+    Under gunicorn this runs once in the master (see gunicorn.conf.py), and the
+    workers fork with the parsed data already in memory.
+    """
+    for scenario in data_provider.get_scenarios():
+        data_provider.get_era_json(scenario["id"])
+        timelines.get_json(scenario["id"])
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
 
 if __name__ == '__main__':
+    warm()
     print("Market Time Machine running on http://localhost:5003")
     app.run(debug=True, port=5003)
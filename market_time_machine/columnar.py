@@ -0,0 +1,171 @@
+import os
+import json
+import hashlib
+import argparse
+import threading
+import numpy as np
+from providers import DataProvider
+
+# --- Columnar Data Layer ---
+# On-disk layout (one directory per era, so eras open independently):
+#
+#   <root>/index.json          era summaries for the timeline page
+#   <root>/<era_id>/meta.json  id, name, assets, events, tickers, timestamps
+#   <root>/<era_id>/prices.npy float64 (T x N) matrix, row = timestamp, col = ticker
+#
+# Rows are contiguous (C order), so a time window is one contiguous slice of
+# the memory-mapped file and only the pages it touches are ever read.
+
+INDEX_FILE = 'index.json'
+META_FILE = 'meta.json'
+PRICES_FILE = 'prices.npy'
+SUMMARY_KEYS = ("id", "name", "year_start", "year_end", "description")
+
+
+class ColumnarDataProvider(DataProvider):
+    """Serves eras from memory-mapped .npy price matrices plus small JSON sidecars."""
+    def __init__(self, data_dir='data/columnar'):
+        self.data_dir = os.path.join(os.path.dirname(__file__), data_dir)
+        self._lock = threading.Lock()
+        self._index = None
+        self._index_version = None
+        self._eras = {}  # era_id -> (meta, memmap), opened on first use
+        self._era_json = {}  # era_id -> (bytes, etag), serialized on first use
+
+    def _index_path(self):
+        return os.path.join(self.data_dir, INDEX_FILE)
+
+    def get_version(self):
+        # The converter rewrites index.json last, so its mtime covers every era
+        return os.stat(self._index_path()).st_mtime_ns
+
+    def _load_index(self):
+        version = self.get_version()
+        if version != self._index_version:
+            with open(self._index_path(), 'r') as f:
+                index = json.load(f)
+            with self._lock:
+                self._index = index
+                self._index_version = version
+                self._eras = {}  # Drop handles to replaced files
+                self._era_json = {}
+        return self._index
+
+    def _open_era(self, era_id):
+        """Returns (meta, prices memmap) without reading any price data."""
+        index = self._load_index()
+        if era_id not in {era["id"] for era in index["eras"]}:
+            return None
+        opened = self._eras.get(era_id)
+        if opened is None:
+            era_dir = os.path.join(self.data_dir, era_id)
+            with open(os.path.join(era_dir, META_FILE), 'r') as f:
+                meta = json.load(f)
+            prices = np.load(os.path.join(era_dir, PRICES_FILE), mmap_mode='r')
+            opened = (meta, prices)
+            with self._lock:
+                self._eras[era_id] = opened
+        return opened
+
+    def get_scenarios(self):
+        return self._load_index()["eras"]
+
+    def get_era_data(self, era_id):
+        """Full era in the JSON provider's shape. Materializes every price; prefer get_window."""
+        return self.get_window(era_id)
+
+    def get_era_json(self, era_id):
+        """Returns (json_bytes, etag) for the whole era, serialized once per data version, or None."""
+        self._load_index()
+        version = self._index_version
+        cached = self._era_json.get(era_id)
+        if cached is None:
+            era = self.get_era_data(era_id)
+            if era is None:
+                return None
+            body = json.dumps(era).encode('utf-8')
+            cached = (body, hashlib.sha1(body).hexdigest())
+            with self._lock:
+                if version == self._index_version:  # Not if the data was replaced meanwhile
+                    self._era_json[era_id] = cached
+        return cached
+
+    def get_price_matrix(self, era_id):
+        opened = self._open_era(era_id)
+        if opened is None:
+            return None
+        meta, prices = opened
+        return meta["tickers"], meta["timestamps"], prices
+
+    def get_window(self, era_id, start=0, stop=None, tickers=None):
+        """
+        Era data for timestamps[start:stop] and (optionally) a subset of tickers.
+        Only the requested rows of the price file are read.
+        """
+        opened = self._open_era(era_id)
+        if opened is None:
+            return None
+        meta, prices = opened
+        columns = meta["tickers"] if tickers is None else [t for t in tickers if t in meta["tickers"]]
+        col_index = {t: i for i, t in enumerate(meta["tickers"])}
+        window = prices[start:stop]  # Zero-copy view into the memmap
+        timestamps = meta["timestamps"][start:stop]
+        era = {key: meta[key] for key in SUMMARY_KEYS}
+        era["assets"] = [a for a in meta["assets"] if a["ticker"] in columns]
+        era["events"] = meta["events"]
+        era["market_data"] = {
+            "timestamps": timestamps,
+            "prices": {t: window[:, col_index[t]].tolist() for t in columns},
+        }
+        return era
+
+
+def convert_json(json_path, out_dir):
+    """Writes every era in a scenarios.json file to the columnar layout in `out_dir`."""
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    os.makedirs(out_dir, exist_ok=True)
+
+    for era in data["eras"]:
+        era_dir = os.path.join(out_dir, era["id"])
+        os.makedirs(era_dir, exist_ok=True)
+        market = era["market_data"]
+        tickers = list(market["prices"].keys())
+        prices = np.ascontiguousarray(
+            np.array([market["prices"][t] for t in tickers], dtype=np.float64).T
+        )
+        meta = {key: era[key] for key in SUMMARY_KEYS}
+        meta.update({
+            "assets": era["assets"],
+            "events": era["events"],
+            "tickers": tickers,
+            "timestamps": market["timestamps"],
+        })
+        # Write beside the target then rename, so readers never see a partial file
+        tmp_prices = os.path.join(era_dir, PRICES_FILE + '.tmp')
+        with open(tmp_prices, 'wb') as f:
+            np.save(f, prices)
+        os.replace(tmp_prices, os.path.join(era_dir, PRICES_FILE))
+        _write_json(os.path.join(era_dir, META_FILE), meta)
+        print(f"Converted {era['id']}: {prices.shape[0]} steps x {prices.shape[1]} tickers")
+
+    _write_json(
+        os.path.join(out_dir, INDEX_FILE),
+        {"eras": [{key: era[key] for key in SUMMARY_KEYS} for era in data["eras"]]}
+    )
+
+
+def _write_json(path, obj):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+if __name__ == '__main__':
+    base = os.path.dirname(__file__)
+    parser = argparse.ArgumentParser(description="Convert scenarios.json to the columnar format.")
+    parser.add_argument('source', nargs='?', default=os.path.join(base, 'data', 'scenarios.json'))
+    parser.add_argument('dest', nargs='?', default=os.path.join(base, 'data', 'columnar'))
+    args = parser.parse_args()
+    convert_json(args.source, args.dest)
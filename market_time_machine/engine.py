@@ -0,0 +1,74 @@
+import math
+import numpy as np
+
+# --- Vectorized Backtest Engine ---
+# Same portfolio rules as the replay in static/js/chart_logic.js:
+#   long  : capital * w   * (p_t / p_0)
+#   short : capital * |w| * (2 - p_t / p_0)
+#   cash  : capital * (1 - sum|w|)
+# which collapses to value_t = capital * (1 + (p_t / p_0 - 1) . w),
+# so a whole run (or thousands of runs) is one matrix product.
+
+INITIAL_CAPITAL = 10000
+MAX_LEVERAGE = 2.0  # Gross exposure cap (200%), same as the client
+
+
+class AllocationError(ValueError):
+    """Raised for allocations the simulator refuses (unknown ticker, too much leverage)."""
+
+
+class Backtester:
+    """Precomputes an era's relative-return matrix once, then evaluates allocations against it."""
+    def __init__(self, tickers, timestamps, prices):
+        """`prices` is (T x N), one column per ticker (see DataProvider.get_price_matrix)."""
+        self.timestamps = list(timestamps)
+        self.tickers = list(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        prices = np.asarray(prices, dtype=np.float64)
+        if np.any(prices[0] == 0):
+            raise ValueError("Era has a zero starting price")
+        # (T x N): growth of 1 unit of each asset since the first timestamp, minus 1
+        self.excess = prices / prices[0] - 1.0
+
+    def weights(self, allocation, max_leverage=MAX_LEVERAGE):
+        """Turns {ticker: weight} into a weight vector, enforcing the leverage cap."""
+        w = np.zeros(len(self.tickers))
+        for ticker, weight in allocation.items():
+            if ticker not in self.index:
+                raise AllocationError(f"Unknown ticker: {ticker}")
+            weight = float(weight)
+            if not math.isfinite(weight):  # JSON allows NaN / Infinity, which would poison every value
+                raise AllocationError(f"Weight for {ticker} must be a finite number")
+            w[self.index[ticker]] = weight
+        exposure = np.abs(w).sum()
+        if exposure > max_leverage + 1e-9:
+            raise AllocationError(f"Exposure {exposure:.0%} exceeds the {max_leverage:.0%} cap")
+        return w
+
+    def values(self, weights, capital=INITIAL_CAPITAL):
+        """
+        Portfolio value series. `weights` is (N,) for one allocation or (K x N)
+        for K allocations at once, giving (T,) or (T x K).
+        """
+        return capital * (1.0 + self.excess @ np.asarray(weights).T)
+
+    def run(self, allocation, capital=INITIAL_CAPITAL, max_leverage=MAX_LEVERAGE):
+        """Full result for one allocation, ready to jsonify."""
+        if not (math.isfinite(capital) and capital > 0):
+            raise AllocationError("capital must be a positive, finite number")
+        w = self.weights(allocation, max_leverage)
+        values = self.values(w, capital)
+        return {
+            "timestamps": self.timestamps,
+            "values": values.round(2).tolist(),
+            "final_value": round(float(values[-1]), 2),
+            "return_pct": round(float(values[-1] / capital - 1) * 100, 2),
+            "max_drawdown_pct": round(float(max_drawdown(values)) * 100, 2),
+            "exposure": round(float(np.abs(w).sum()), 4),
+        }
+
+
+def max_drawdown(values):
+    """Largest peak-to-trough fall along axis 0, as a positive fraction."""
+    peaks = np.maximum.accumulate(values, axis=0)
+    return np.max(1.0 - values / peaks, axis=0)
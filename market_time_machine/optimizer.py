@@ -0,0 +1,226 @@
+import os
+import math
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from engine import MAX_LEVERAGE, AllocationError, max_drawdown
+
+# --- Batch Optimizer & Monte Carlo Stress Test ---
+# Allocations are rows of a (K x N) weight matrix. Each chunk of rows is one
+# matrix product against the era's (T x N) excess-return matrix, so the
+# per-portfolio cost is a handful of flops; chunks fan out over a process pool
+# only when the batch is big enough to repay the hand-off.
+
+MAX_SAMPLES = 1_000_000
+MAX_GRID_POINTS = 5_000_000  # Grid points walked (before the leverage filter) per request
+MAX_PATHS = 100_000
+CHUNK_SIZE = 25_000
+STRESS_CHUNK_CELLS = 2_000_000  # paths x steps x tickers resampled at once (16 MB of float64)
+PARALLEL_THRESHOLD = 20_000_000  # T * K cells before a process pool pays off
+PERCENTILES = (5, 25, 50, 75, 95)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """One lazily created pool per process; spawn avoids forking a threaded server."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def evaluate_chunk(excess, weights):
+    """
+    Metrics for a (K x N) block of allocations over one (T x N) price path.
+    Returns a (3 x K) array: total return, max drawdown, step volatility.
+    """
+    values = 1.0 + excess @ weights.T  # (T x K), starting capital = 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        step_returns = values[1:] / values[:-1] - 1.0
+        volatility = step_returns.std(axis=0) if len(step_returns) else np.zeros(len(weights))
+    volatility = np.where(np.isfinite(volatility), volatility, np.inf)
+    return np.vstack([values[-1] - 1.0, max_drawdown(values), volatility])
+
+
+def evaluate(excess, weights):
+    """evaluate_chunk over all rows, in parallel across cores for large batches."""
+    chunks = [weights[i:i + CHUNK_SIZE] for i in range(0, len(weights), CHUNK_SIZE)]
+    if len(chunks) == 1 or excess.shape[0] * len(weights) < PARALLEL_THRESHOLD:
+        return np.hstack([evaluate_chunk(excess, c) for c in chunks])
+    pool = _get_pool()
+    return np.hstack(list(pool.map(evaluate_chunk, itertools.repeat(excess), chunks)))
+
+
+def random_allocations(n_tickers, samples, max_leverage=MAX_LEVERAGE, allow_short=True, seed=None):
+    """Uniformly random directions, scaled to a uniformly random gross exposure <= the cap."""
+    rng = np.random.default_rng(seed)
+    w = rng.standard_normal((samples, n_tickers))
+    if not allow_short:
+        w = np.abs(w)
+    w /= np.abs(w).sum(axis=1, keepdims=True)
+    return w * rng.uniform(0, max_leverage, size=(samples, 1))
+
+
+def grid_allocations(n_tickers, step, max_leverage=MAX_LEVERAGE, allow_short=True):
+    """
+    Every allocation on a `step` grid whose gross exposure fits under the cap.
+    The full grid is walked CHUNK_SIZE points at a time and filtered as it
+    goes, so memory is bounded by what is kept, never by the whole grid.
+    """
+    levels = np.arange(-1.0 if allow_short else 0.0, 1.0 + 1e-9, step)
+    shape = (len(levels),) * n_tickers
+    total = len(levels) ** n_tickers  # Python int: can't overflow
+    if total > MAX_GRID_POINTS:
+        raise AllocationError("Grid too large; use a coarser step, fewer tickers or mode=random")
+    kept, count = [], 0
+    for start in range(0, total, CHUNK_SIZE):
+        index = np.unravel_index(np.arange(start, min(start + CHUNK_SIZE, total)), shape)
+        chunk = levels[np.stack(index, axis=1)]
+        chunk = chunk[np.abs(chunk).sum(axis=1) <= max_leverage + 1e-9]
+        count += len(chunk)
+        if count > MAX_SAMPLES:
+            raise AllocationError(f"Grid has more than {MAX_SAMPLES} allocations; use a coarser step")
+        kept.append(chunk)
+    return np.concatenate(kept) if kept else np.zeros((0, n_tickers))
+
+
+def efficient_frontier(returns, risk, limit=50):
+    """Indices of Pareto-optimal portfolios: no other has more return for less risk."""
+    order = np.lexsort((-returns, risk))
+    best_so_far = np.maximum.accumulate(returns[order])
+    is_new_best = np.concatenate([[True], best_so_far[1:] > best_so_far[:-1]])
+    frontier = order[is_new_best & np.isfinite(risk[order])]
+    if len(frontier) > limit:
+        frontier = frontier[np.linspace(0, len(frontier) - 1, limit).astype(int)]
+    return frontier
+
+
+def _allocation(tickers, w):
+    return {t: round(float(x), 4) for t, x in zip(tickers, w) if abs(x) > 1e-9}
+
+
+def _portfolio(tickers, weights, metrics, i):
+    return {
+        "allocation": _allocation(tickers, weights[i]),
+        "return_pct": round(float(metrics[0, i]) * 100, 2),
+        "max_drawdown_pct": round(float(metrics[1, i]) * 100, 2),
+        "volatility_pct": round(float(metrics[2, i]) * 100, 2),
+    }
+
+
+def _distribution(values):
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return {}
+    stats = {f"p{p}": round(float(v) * 100, 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+    stats["mean"] = round(float(values.mean()) * 100, 2)
+    return stats
+
+
+def optimize(backtester, tickers=None, mode='random', samples=10000, step=0.25,
+             max_leverage=MAX_LEVERAGE, allow_short=True, risk='volatility', top=5, seed=None):
+    """
+    Evaluates a batch of allocations over `tickers` (default: all) and returns
+    the efficient frontier, best and worst outcomes and drawdown statistics.
+    """
+    if tickers is not None and not (isinstance(tickers, list) and all(isinstance(t, str) for t in tickers)):
+        raise AllocationError("tickers must be a list of ticker symbols")
+    tickers = list(tickers or backtester.tickers)
+    if len(set(tickers)) != len(tickers):
+        raise AllocationError("tickers must not repeat")
+    unknown = [t for t in tickers if t not in backtester.index]
+    if unknown:
+        raise AllocationError(f"Unknown tickers: {', '.join(unknown)}")
+    if not (math.isfinite(max_leverage) and 0 < max_leverage <= MAX_LEVERAGE):
+        raise AllocationError(f"max_leverage must be in (0, {MAX_LEVERAGE}]")
+    if risk not in ('volatility', 'drawdown'):
+        raise AllocationError("risk must be volatility or drawdown")
+
+    if mode == 'grid':
+        if not (math.isfinite(step) and 0.01 <= step <= 1):
+            raise AllocationError("step must be between 0.01 and 1")
+        weights = grid_allocations(len(tickers), step, max_leverage, allow_short)
+    elif mode == 'random':
+        if not 1 <= samples <= MAX_SAMPLES:
+            raise AllocationError(f"samples must be between 1 and {MAX_SAMPLES}")
+        weights = random_allocations(len(tickers), samples, max_leverage, allow_short, seed)
+    else:
+        raise AllocationError("mode must be grid or random")
+
+    excess = backtester.excess[:, [backtester.index[t] for t in tickers]]
+    metrics = evaluate(np.ascontiguousarray(excess), weights)
+    returns = metrics[0]
+    risk_values = metrics[2] if risk == 'volatility' else metrics[1]
+    ranked = np.argsort(-returns)
+    top = max(0, min(top, len(weights)))
+
+    return {
+        "evaluated": len(weights),
+        "tickers": tickers,
+        "risk_measure": risk,
+        "frontier": [_portfolio(tickers, weights, metrics, i) for i in efficient_frontier(returns, risk_values)],
+        "best": [_portfolio(tickers, weights, metrics, i) for i in ranked[:top]],
+        "worst": [_portfolio(tickers, weights, metrics, i) for i in ranked[::-1][:top]],
+        "return_pct": _distribution(returns),
+        "max_drawdown_pct": _distribution(metrics[1]),
+        "probability_of_loss": round(float((returns < 0).mean()), 4),
+    }
+
+
+def stress_test(backtester, allocation, paths=10000, seed=None):
+    """
+    Monte Carlo: rebuilds `paths` alternative histories by bootstrapping the
+    era's step returns (whole rows, so cross-asset moves stay correlated) and
+    runs `allocation` through each of them.
+    """
+    if not 1 <= paths <= MAX_PATHS:
+        raise AllocationError(f"paths must be between 1 and {MAX_PATHS}")
+    w = backtester.weights(allocation)
+    growth = 1.0 + backtester.excess  # (T x N) price relative to the first step
+    n_steps = len(growth) - 1
+    if n_steps < 1:
+        raise AllocationError("Era is too short to resample")
+    step_growth = growth[1:] / growth[:-1]
+
+    # Buy-and-hold: each asset compounds on its own path, so the per-asset
+    # growth is needed; bounding the paths per chunk bounds the memory instead
+    held = np.flatnonzero(w)
+    step_growth, held_w = step_growth[:, held], w[held]
+    per_chunk = max(1, STRESS_CHUNK_CELLS // (n_steps * max(len(held), 1)))
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for start in range(0, paths, per_chunk):
+        n = min(per_chunk, paths - start)
+        draws = rng.integers(0, n_steps, size=(n, n_steps))
+        sampled = step_growth[draws]  # (n x steps x held)
+        np.cumprod(sampled, axis=1, out=sampled)
+        sampled -= 1.0
+        values = np.ones((n, n_steps + 1))  # (n x T)
+        values[:, 1:] += sampled @ held_w
+        results.append(np.vstack([values[:, -1] - 1.0, max_drawdown(values.T)]))
+    metrics = np.hstack(results)
+    returns, drawdowns = metrics
+
+    historical = evaluate_chunk(backtester.excess, w[None, :])[:, 0]
+    return {
+        "paths": paths,
+        "allocation": _allocation(backtester.tickers, w),
+        "historical": {
+            "return_pct": round(float(historical[0]) * 100, 2),
+            "max_drawdown_pct": round(float(historical[1]) * 100, 2),
+        },
+        "return_pct": _distribution(returns),
+        "max_drawdown_pct": _distribution(drawdowns),
+        "probability_of_loss": round(float((returns < 0).mean()), 4),
+        "worst_return_pct": round(float(returns.min()) * 100, 2),
+        "best_return_pct": round(float(returns.max()) * 100, 2),
+    }
@@ -0,0 +1,167 @@
+import os
+import json
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+from instrumentation import span
+
+# --- Scalable Data Layer ---
+class DataProvider(ABC):
+    """
+    Abstract Base Class for Data Fetching.
+    Allows easy swapping between local JSON (MVP) and Paid APIs (Scale).
+    """
+    @abstractmethod
+    def get_scenarios(self):
+        """Returns list of available eras."""
+        pass
+
+    @abstractmethod
+    def get_era_data(self, era_id):
+        """Returns detailed simulation data for a specific era."""
+        pass
+
+    def get_all_eras(self):
+        """Returns every era's full data. Override when one bulk read is cheaper."""
+        return [self.get_era_data(s["id"]) for s in self.get_scenarios()]
+
+    def get_version(self):
+        """Changes whenever the underlying data changes; None if unknown."""
+        return None
+
+    def get_era_json(self, era_id):
+        """Returns (json_bytes, etag) for an era, or None. Override to cache."""
+        era = self.get_era_data(era_id)
+        if era is None:
+            return None
+        body = json.dumps(era).encode('utf-8')
+        return body, hashlib.sha1(body).hexdigest()
+
+    def get_window(self, era_id, start=0, stop=None, tickers=None):
+        """Era data restricted to timestamps[start:stop] and, optionally, some tickers."""
+        era = self.get_era_data(era_id)
+        if era is None:
+            return None
+        market = era["market_data"]
+        columns = list(market["prices"]) if tickers is None else [t for t in tickers if t in market["prices"]]
+        window = dict(era)
+        window["assets"] = [a for a in era["assets"] if a["ticker"] in columns]
+        window["market_data"] = {
+            "timestamps": market["timestamps"][start:stop],
+            "prices": {t: market["prices"][t][start:stop] for t in columns},
+        }
+        return window
+
+    def get_price_matrix(self, era_id):
+        """
+        Returns (tickers, timestamps, prices) with prices as a (T x N) float array,
+        or None. Columnar providers return it without touching JSON at all.
+        """
+        era = self.get_era_data(era_id)
+        if era is None:
+            return None
+        market = era["market_data"]
+        tickers = list(market["prices"].keys())
+        prices = np.array([market["prices"][t] for t in tickers], dtype=np.float64).T
+        return tickers, market["timestamps"], prices
+
+class JsonDataProvider(DataProvider):
+    """MVP: Loads data from local JSON files."""
+    def __init__(self, data_path='data/scenarios.json'):
+        self.data_path = os.path.join(os.path.dirname(__file__), data_path)
+
+    def _load_data(self):
+        with span('json_provider.load_data'), open(self.data_path, 'r') as f:
+            return json.load(f)
+
+    def get_scenarios(self):
+        data = self._load_data()
+        # Return summary list for the timeline
+        return [
+            {
+                "id": era["id"],
+                "name": era["name"],
+                "year_start": era["year_start"],
+                "year_end": era["year_end"],
+                "description": era["description"]
+            }
+            for era in data["eras"]
+        ]
+
+    def get_era_data(self, era_id):
+        data = self._load_data()
+        for era in data["eras"]:
+            if era["id"] == era_id:
+                return era
+        return None
+
+    def get_all_eras(self):
+        return self._load_data()["eras"]
+
+    def get_version(self):
+        return os.stat(self.data_path).st_mtime_ns
+
+class CachedDataProvider(DataProvider):
+    """
+    Wraps any DataProvider: loads everything once, indexes eras by id and keeps
+    each era pre-serialized as JSON bytes with an ETag. Reloads only when the
+    wrapped provider's get_version() changes (file mtime for JsonDataProvider).
+    """
+    def __init__(self, provider):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._version = object()  # Never equal to a real version
+        self._scenarios = []
+        self._eras = {}
+        self._era_json = {}  # era_id -> (bytes, etag)
+
+    def _ensure_loaded(self):
+        version = self.provider.get_version()
+        if version == self._version and (version is not None or self._eras):
+            return
+        with self._lock:
+            if version == self._version and (version is not None or self._eras):
+                return
+            eras = self.provider.get_all_eras()
+            era_json = {}
+            for era in eras:
+                body = json.dumps(era).encode('utf-8')
+                era_json[era["id"]] = (body, hashlib.sha1(body).hexdigest())
+            # Swap all at once so readers never see a half-built index
+            self._scenarios = [
+                {
+                    "id": era["id"],
+                    "name": era["name"],
+                    "year_start": era["year_start"],
+                    "year_end": era["year_end"],
+                    "description": era["description"]
+                }
+                for era in eras
+            ]
+            self._eras = {era["id"]: era for era in eras}
+            self._era_json = era_json
+            self._version = version
+
+    def get_scenarios(self):
+        self._ensure_loaded()
+        return self._scenarios
+
+    def get_era_data(self, era_id):
+        self._ensure_loaded()
+        return self._eras.get(era_id)
+
+    def get_all_eras(self):
+        self._ensure_loaded()
+        return list(self._eras.values())
+
+    def get_version(self):
+        self._ensure_loaded()
+        return self._version
+
+    def get_era_json(self, era_id):
+        """Returns (json_bytes, etag) for an era, or None."""
+        self._ensure_loaded()
+        return self._era_json.get(era_id)
+
+# Future: class PolygonApiProvider(DataProvider): ...
@@ -0,0 +1,69 @@
+import numpy as np
+
+# --- Downsampling ---
+# Both functions return sorted row indices into a (T,) series, always keeping
+# the first and last point, so every ticker can be sampled on the same x-axis.
+
+
+def lttb_indices(y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: keeps the points that best preserve the
+    visual shape of the line. O(T), one small NumPy step per output bucket.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)  # n_out - 2 inner buckets
+    picked = np.empty(n_out, dtype=int)
+    picked[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    picked[-1] = n - 1
+    return picked
+
+
+def minmax_indices(y, n_out):
+    """Keeps each bucket's min and max, so spikes and crashes always survive."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 4:
+        return lttb_indices(y, n_out)
+
+    picked = {0, n - 1}
+    for bucket in np.array_split(np.arange(1, n - 1), (n_out - 2) // 2):
+        if len(bucket):
+            picked.add(int(bucket[np.argmin(y[bucket])]))
+            picked.add(int(bucket[np.argmax(y[bucket])]))
+    return np.array(sorted(picked))
+
+
+def shape_series(prices):
+    """
+    One series standing in for several tickers when picking shared indices:
+    the equal-weight growth of the selection (each price over its first price).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim == 1:
+        return prices
+    start = np.where(prices[0] == 0, 1.0, prices[0])
+    return (prices / start).mean(axis=1)
+
+
+METHODS = {'lttb': lttb_indices, 'minmax': minmax_indices}
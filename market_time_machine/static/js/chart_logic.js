@@ -1,9 +1,10 @@
 let chart;
-let simulationData = null;
+let simulationData = null; // Compiled era from /api/era/<id>/summary
 let currentStep = 0;
 let portfolioClean = 10000;
 let allocation = {};
 let interval;
+let simulationValues = []; // Authoritative value series from /api/simulate
 
 function filterTickers() {
     const query = document.getElementById('ticker-search').value.toUpperCase();
@@ -19,8 +20,8 @@ function filterTickers() {
 }
 
 async function init() {
-    // 1. Fetch Data
-    const response = await fetch(`/api/data/${ERA_ID}`);
+    // 1. Fetch Data (timestamps + events indexed by step; values come from /api/simulate)
+    const response = await fetch(`/api/era/${ERA_ID}/summary`);
     simulationData = await response.json();
 
     // 2. Setup Chart
@@ -134,10 +135,9 @@ function updateAllocation() {
     else document.getElementById('total-alloc').style.color = '#666';
 }
 
-function startSimulation() {
+async function startSimulation() {
     if (!simulationData) return;
 
-    // Check exposure
     // Check exposure
     let totalExposure = Object.values(allocation).reduce((a, b) => a + Math.abs(b), 0);
     if (totalExposure > 2.05) { // Allow up to 200%
@@ -146,6 +146,20 @@ function startSimulation() {
         return;
     }
 
+    // Server computes the whole run in one pass; the client just replays it
+    const response = await fetch(`/api/simulate/${ERA_ID}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ allocation: allocation, capital: 10000 })
+    });
+    const result = await response.json();
+    if (!response.ok) {
+        log(`ERROR: ${result.error}`);
+        alert(result.error);
+        return;
+    }
+    simulationValues = result.values;
+
     // Reset
     chart.data.labels = [];
     chart.data.datasets[0].data = [];
@@ -158,46 +172,14 @@ function startSimulation() {
 }
 
 function step() {
-    if (currentStep >= simulationData.market_data.timestamps.length) {
+    if (currentStep >= simulationData.steps) {
         clearInterval(interval);
         log("SIMULATION COMPLETE.");
         return;
     }
 
-    const timestamp = simulationData.market_data.timestamps[currentStep];
-    const prices = simulationData.market_data.prices;
-
-    // Calculate Portfolio Value
-    let currentValue = 0;
-
-    if (currentStep === 0) {
-        currentValue = 10000; // Start
-    } else {
-        // Value = Cash + Positions
-        let totalExposure = 0;
-
-        Object.keys(allocation).forEach(ticker => {
-            const ratio = allocation[ticker]; // e.g., -0.5 or 0.5
-            totalExposure += Math.abs(ratio);
-
-            const startPrice = prices[ticker][0];
-            const currentPrice = prices[ticker][currentStep];
-            const dollarsInvested = 10000 * Math.abs(ratio);
-
-            if (ratio >= 0) {
-                // LONG
-                currentValue += dollarsInvested * (currentPrice / startPrice);
-            } else {
-                // SHORT
-                // Multiplier = 2 - (Current/Start). 
-                let multiplier = 2 - (currentPrice / startPrice);
-                currentValue += dollarsInvested * multiplier;
-            }
-        });
-
-        // Add remaining cash
-        currentValue += 10000 * (1 - totalExposure);
-    }
+    const timestamp = simulationData.timestamps[currentStep];
+    const currentValue = simulationValues[currentStep];
 
     // Update Chart
     chart.data.labels.push(timestamp);
@@ -209,10 +191,8 @@ function step() {
     if (currentValue >= 10000) document.getElementById('current-value').className = "portfolio-value green";
     else document.getElementById('current-value').className = "portfolio-value red";
 
-    // Check Events
-    const events = simulationData.events;
-    // Find event that matches CURRENT timestamp
-    const event = events.find(e => e.date === timestamp);
+    // Check Events (indexed by step on the server)
+    const event = simulationData.events[currentStep];
     if (event) {
         log(`EVENT: [${event.title}] - ${event.description}`);
         showNews(event.title, event.description);
@@ -234,7 +214,7 @@ function showNews(title, desc) {
     // Hide after 4s
     setTimeout(() => {
         el.classList.remove('active');
-        if (currentStep < simulationData.market_data.timestamps.length) {
+        if (currentStep < simulationData.steps) {
             interval = setInterval(step, 500);
         }
     }, 4000);
@@ -0,0 +1,24 @@
+import os
+import sys
+import importlib.util
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app's modules are top-level (run from the app directory), so put it on the path
+sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture(scope='session')
+def market_app():
+    """The app module, loaded under its own name: other apps in the lab also have an `app` module."""
+    spec = importlib.util.spec_from_file_location('market_time_machine_app', os.path.join(APP_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def client(market_app):
+    return market_app.app.test_client()
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+ERA = 'tulip_mania'
+
+
+@pytest.mark.parametrize('interval', ['nan', 'inf', '-inf'])
+def test_stream_rejects_non_finite_interval(client, interval):
+    response = client.get(f'/api/data/{ERA}?stream=ndjson&interval={interval}')
+    assert response.status_code == 400
+    assert 'interval' in response.get_json()['error']
+
+
+def test_stream_sends_every_step(client):
+    response = client.get(f'/api/data/{ERA}?stream=ndjson&interval=0')
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert response.status_code == 200
+    assert records[0]['type'] == 'meta' and records[-1]['type'] == 'end'
+    assert len(records) == records[0]['steps'] + 2
+
+
+def test_backtester_is_built_once_per_data_version(client, market_app, monkeypatch):
+    allocation = {'allocation': {'VOC': 0.5, 'GOUDA': 0.5}}
+    first = client.post(f'/api/simulate/{ERA}', json=allocation)
+    backtester = market_app.timelines.backtester(ERA)
+    assert client.post(f'/api/stress/{ERA}', json=dict(allocation, paths=50, seed=1)).status_code == 200
+    assert client.post(f'/api/simulate/{ERA}', json=allocation).get_json() == first.get_json()
+    assert market_app.timelines.backtester(ERA) is backtester
+
+    # New data (e.g. scenarios.json saved again) builds a fresh one
+    monkeypatch.setattr(market_app.data_provider, 'get_version', lambda: 'next')
+    assert market_app.timelines.backtester(ERA) is not backtester
@@ -0,0 +1,135 @@
+import json
+import hashlib
+import threading
+import numpy as np
+from engine import Backtester, max_drawdown
+
+# --- Compiled Era Timelines ---
+# Everything about an era that doesn't depend on the player's allocation is
+# derived once per data version: the events indexed by step (the replay looks
+# them up per tick instead of searching the list), each asset's price series
+# normalized to its first price, and peak / trough / drawdown / volatility
+# statistics per asset and for an equal-weight basket of the whole era.
+
+
+def _stats(series):
+    """Statistics for each column of a (T x N) price array, as a list of dicts."""
+    first, last = series[0], series[-1]
+    drawdowns = max_drawdown(series)
+    if len(series) > 1:
+        # A delisted asset sits at 0; steps from 0 count as no change
+        previous = series[:-1]
+        step_returns = np.divide(np.diff(series, axis=0), previous,
+                                 out=np.zeros_like(previous), where=previous != 0)
+        volatility = step_returns.std(axis=0)
+    else:
+        volatility = np.zeros(series.shape[1])
+    peaks, troughs = series.argmax(axis=0), series.argmin(axis=0)
+    return [
+        {
+            "start": float(first[j]),
+            "end": float(last[j]),
+            "peak": float(series[peaks[j], j]),
+            "peak_step": int(peaks[j]),
+            "trough": float(series[troughs[j], j]),
+            "trough_step": int(troughs[j]),
+            "return_pct": round(float(last[j] / first[j] - 1) * 100, 2),
+            "max_drawdown_pct": round(float(drawdowns[j]) * 100, 2),
+            "volatility_pct": round(float(volatility[j]) * 100, 2),
+        }
+        for j in range(series.shape[1])
+    ]
+
+
+def compile_era(era, tickers, timestamps, prices):
+    """
+    Derived, allocation-independent view of one era. `era` supplies the id and
+    events; the rest is DataProvider.get_price_matrix(). Volatility is the
+    standard deviation of step-to-step returns (steps are not evenly spaced
+    across eras, so it is not annualized).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(prices) == 0:
+        raise ValueError("Era has no price data")
+    if np.any(prices[0] == 0):
+        raise ValueError("Era has a zero starting price")
+    timestamps = list(timestamps)
+    step_of = {ts: i for i, ts in enumerate(timestamps)}
+
+    # First event per step, as the replay shows; events off the timeline never show
+    events = {}
+    for event in era["events"]:
+        if event["date"] in step_of:
+            events.setdefault(step_of[event["date"]], event)
+
+    normalized = prices / prices[0]
+    basket = normalized.mean(axis=1, keepdims=True)  # Equal-weight index of the era
+    assets = dict(zip(tickers, _stats(prices)))
+    returns = {t: s["return_pct"] for t, s in assets.items()}
+    era_stats = _stats(basket)[0]
+    era_stats.update(
+        best=max(returns, key=returns.get) if returns else None,
+        worst=min(returns, key=returns.get) if returns else None,
+    )
+
+    return {
+        "era_id": era["id"],
+        "steps": len(timestamps),
+        "timestamps": timestamps,
+        "events": events,
+        "tickers": list(tickers),
+        "normalized": {t: normalized[:, j].round(6).tolist() for j, t in enumerate(tickers)},
+        "assets": assets,
+        "era": era_stats,
+    }
+
+
+class TimelineCache:
+    """
+    Compiled eras for one DataProvider, each built on first use and kept,
+    pre-serialized with an ETag, until the provider's get_version() changes.
+    The era's Backtester is built alongside, so simulations, optimizer runs
+    and stress tests don't rebuild the price matrix per request.
+    """
+    def __init__(self, provider):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._version = object()  # Never equal to a real version
+        self._compiled = {}  # era_id -> (summary, json_bytes, etag, backtester)
+
+    def _get(self, era_id):
+        version = self.provider.get_version()
+        with self._lock:
+            if version != self._version:
+                self._compiled = {}
+                self._version = version
+            cached = self._compiled.get(era_id)
+        if cached is not None:
+            return cached
+
+        matrix = self.provider.get_price_matrix(era_id)
+        if not matrix:
+            return None
+        era = self.provider.get_window(era_id, 0, 0)  # Metadata only, no prices
+        summary = compile_era(era, *matrix)
+        body = json.dumps(summary).encode('utf-8')
+        cached = (summary, body, hashlib.sha1(body).hexdigest(), Backtester(*matrix))
+        with self._lock:
+            if version == self._version:
+                self._compiled[era_id] = cached
+        return cached
+
+    def get(self, era_id):
+        """The compiled era (see compile_era), or None. Shared, so treat it as read-only."""
+        cached = self._get(era_id)
+        return cached[0] if cached else None
+
+    def get_json(self, era_id):
+        """Returns (json_bytes, etag) for the compiled era, or None."""
+        cached = self._get(era_id)
+        return cached[1:3] if cached else None
+
+    def backtester(self, era_id):
+        """The era's Backtester, or None. Shared between requests, so treat it as read-only."""
+        cached = self._get(era_id)
+        return cached[3] if cached else None
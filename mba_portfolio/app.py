@@ -1,23 +1,32 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-import json
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response
 import os
+import json
+import threading
 from functools import wraps
+from content_store import ContentStore
+from refiner import Refiner, RefineError
+from instrumentation import instrument, span
+from lab_common.http_cache import HttpCache  # lab_common is on the path via instrumentation
 
 app = Flask(__name__)
+instrument(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev_key_for_session')
 
 # Configuration
 DATA_FILE = os.path.join('data', 'content.json')
 
+# Parsed once per worker; re-read only after a save (from any worker)
+CONTENT = ContentStore(DATA_FILE)
+
 def load_content():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    with span('load_content'):
+        return CONTENT.get()
 
 def save_content(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
+    return CONTENT.save(data)
+
+# Rendered index page and fingerprinted static files, with ETags and Cache-Control
+HTTP_CACHE = HttpCache(app)
 
 # Login Decorator
 def login_required(f):
@@ -30,8 +39,7 @@ def decorated_function(*args, **kwargs):
 
 @app.route('/')
 def index():
-    content = load_content()
-    return render_template('index.html', content=content)
+    return HTTP_CACHE.page('index', CONTENT.version, lambda: render_template('index.html', content=load_content()))
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -54,39 +62,109 @@ def admin():
 @app.route('/api/save', methods=['POST'])
 @login_required
 def api_save():
-    new_data = request.json
-    save_content(new_data)
-    return jsonify({"status": "success"})
+    new_data = request.get_json(silent=True)
+    if not isinstance(new_data, dict):
+        return jsonify({"error": "Content must be a JSON object"}), 400
+    version = save_content(new_data)
+    return jsonify({"status": "success", "version": version})
+
+# --- Gemini AI ---
+GEMINI_MODEL = 'gemini-2.0-flash'
+
+def gemini_model():
+    """Configured once, on the first refinement (see Refiner)."""
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ.get('GEMINI_API_KEY'))
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+# Cached, coalesced and rate-limited; REFINE_* env vars tune the limits
+REFINER = Refiner(
+    gemini_model,
+    cache_size=int(os.environ.get('REFINE_CACHE_SIZE', 256)),
+    ttl=int(os.environ.get('REFINE_CACHE_TTL', 3600)),
+    max_concurrent=int(os.environ.get('REFINE_MAX_CONCURRENT', 4)),
+    timeout=float(os.environ.get('REFINE_TIMEOUT', 30)),
+)
 
-# Stub for Gemini AI
 @app.route('/api/refine', methods=['POST'])
 @login_required
 def api_refine():
-    text = request.json.get('text')
-    api_key = os.environ.get('GEMINI_API_KEY')
-    
-    if not api_key:
-        return jsonify({"suggestion": "Error: GEMINI_API_KEY not found in environment."})
+    """
+    Body: {"text": "..."} -> {"suggestion": "..."}.
+    With ?stream=sse the suggestion arrives as it is written: `chunk` events
+    ({"text"}), then `done` ({"suggestion"}) or `error` ({"error", "status"}).
+    """
+    text = (request.get_json(silent=True) or {}).get('text')
+    if not text or not text.strip():
+        return jsonify({"error": "Text is required"}), 400
+    if not os.environ.get('GEMINI_API_KEY'):
+        return jsonify({"error": "GEMINI_API_KEY not found in environment."}), 503
 
+    stream = request.args.get('stream')
+    if stream and stream != 'sse':
+        return jsonify({"error": "stream must be sse"}), 400
     try:
-        import google.generativeai as genai
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash') # Using newer model if avail, or pro
-
-        prompt = f"""
-        Act as a senior executive coach. Rewrite the text below to be "Executive Style":
-        1. Concise and high-impact.
-        2. Focus on decision-making, constraints, and outcomes.
-        3. Remove fluff and buzzwords.
-        
-        Input Text:
-        "{text}"
-        """
-        
-        response = model.generate_content(prompt)
-        return jsonify({"suggestion": response.text})
-    except Exception as e:
-        return jsonify({"suggestion": f"AI Error: {str(e)}"})
+        if stream:
+            return stream_refinement(REFINER.stream(text))
+        return jsonify({"suggestion": REFINER.refine(text)})
+    except RefineError as e:
+        return jsonify({"error": str(e)}), e.status
+
+def stream_refinement(chunks):
+    """Relays refinement chunks as Server-Sent Events."""
+    def event(kind, payload):
+        return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+
+    def generate():
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield event('chunk', {"text": chunk})
+            yield event('done', {"suggestion": ''.join(parts)})
+        except RefineError as e:
+            yield event('error', {"error": str(e), "status": e.status})
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let proxies pass chunks through immediately
+    return response
+
+# --- Startup ---
+# Importing this module starts nothing, so gunicorn can preload it in the
+# master and fork workers from it (see gunicorn.conf.py).
+BACKGROUND_PID = None
+
+def warm():
+    """Loads the content and compiles the templates, before any traffic is accepted."""
+    load_content()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+def start_background():
+    """
+    Creates this worker's Gemini client in the background, so the first
+    refinement doesn't pay for the import. Not done in the master: the
+    client's network stack isn't safe to carry across a fork.
+    """
+    global BACKGROUND_PID
+    if BACKGROUND_PID == os.getpid() or not os.environ.get('GEMINI_API_KEY'):
+        return
+    BACKGROUND_PID = os.getpid()
+
+    def preload():
+        try:
+            REFINER.model()
+        except Exception as e:
+            print(f"Gemini client not preloaded: {e}")
+
+    threading.Thread(target=preload, daemon=True).start()
+
+@app.before_request
+def ensure_background():
+    # Covers servers that don't run the gunicorn.conf.py hooks
+    start_background()
 
 if __name__ == '__main__':
+    warm()
     app.run(debug=True)
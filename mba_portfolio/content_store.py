@@ -0,0 +1,107 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, assume a single process
+    fcntl = None
+
+
+class ContentStore:
+    """
+    The site's content document, parsed once and kept in memory.
+
+    Each read costs one os.stat(): the file's (mtime, inode, size) signature
+    tells whether another worker has saved since, and only then is the file
+    parsed again. Saves write a temp file and rename it over the original,
+    so readers see the old or the new document and never a partial one.
+    A lock file serializes writers across gunicorn workers.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._content = {}
+        self._signature = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+    @property
+    def version(self):
+        """Changes on every save, in any worker; 0 while there is no content file."""
+        return _version(self._stat())
+
+    def get(self):
+        """The current document. Shared between requests, so treat it as read-only."""
+        signature = self._stat()
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    content = {}
+                    if signature is not None:
+                        with open(self.path, 'r') as f:
+                            content = json.load(f)
+                    self._content = content
+                    self._signature = signature
+        return self._content
+
+    def save(self, content):
+        """Atomically replaces the document and returns the new version."""
+        text = json.dumps(content, indent=4)
+        directory = os.path.dirname(self.path) or '.'
+        with self._lock, _FileLock(self.path + '.lock'):
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix='.content-', suffix='.tmp')
+            try:
+                # mkstemp creates 0600; keep the permissions the file had
+                try:
+                    os.chmod(tmp, os.stat(self.path).st_mode & 0o777)
+                except FileNotFoundError:
+                    os.chmod(tmp, 0o644)
+                with os.fdopen(fd, 'w') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            # Write-through: this worker never re-reads its own save
+            self._content = json.loads(text)
+            self._signature = self._stat()
+        return _version(self._signature)
+
+
+def _version(signature):
+    # The whole signature, not just the mtime: two saves within the
+    # filesystem's mtime granularity still differ in inode (each save is a
+    # new file) and usually in size
+    if signature is None:
+        return 0
+    return hashlib.sha1(repr(signature).encode()).hexdigest()[:16]
+
+
+class _FileLock:
+    """Exclusive flock on `path` for the duration of a with-block."""
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        return False
@@ -0,0 +1,13 @@
+# Gunicorn settings and hooks, shared by every app in the lab: see
+# lab_common/gunicorn_conf.py. The repo root above this directory goes on the
+# path first, as in instrumentation.py.
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from lab_common.gunicorn_conf import preload_app, when_ready, post_worker_init  # noqa: E402
+
+__all__ = ['preload_app', 'when_ready', 'post_worker_init']
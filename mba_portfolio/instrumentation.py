@@ -0,0 +1,13 @@
+# Request metrics, spans and the slow-request profiler are shared by every app
+# in the lab: see lab_common/instrumentation.py. The app runs from its own
+# directory, so the repo root above it goes on the path first.
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from lab_common.instrumentation import METRICS, Metrics, SlowRequestProfiler, instrument, span  # noqa: E402
+
+__all__ = ['METRICS', 'Metrics', 'SlowRequestProfiler', 'instrument', 'span']
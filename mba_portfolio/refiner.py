@@ -0,0 +1,254 @@
+import time
+import queue
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from instrumentation import span
+
+# Bump whenever PROMPT changes so cached suggestions from the old prompt are not reused
+PROMPT_VERSION = 1
+PROMPT = """
+        Act as a senior executive coach. Rewrite the text below to be "Executive Style":
+        1. Concise and high-impact.
+        2. Focus on decision-making, constraints, and outcomes.
+        3. Remove fluff and buzzwords.
+
+        Input Text:
+        "{text}"
+        """
+
+
+class RefineError(Exception):
+    """The model call failed; `status` is the HTTP status to answer with."""
+    status = 502
+
+
+class RefineBusy(RefineError):
+    status = 503
+
+
+class RefineTimeout(RefineError):
+    status = 504
+
+
+def normalize_text(text):
+    """Whitespace-insensitive form of the input, so re-submits of the same paragraph match."""
+    return ' '.join((text or '').split())
+
+
+def build_prompt(text):
+    return PROMPT.replace('{text}', text)
+
+
+class Refiner:
+    """
+    Executive-style rewrites from a generative model, behind:
+      - one model client, created on first use and reused
+      - an LRU + TTL cache keyed on the normalized text and PROMPT_VERSION
+      - coalescing: identical requests in flight share one model call
+      - at most `max_concurrent` model calls at once, each given `timeout`
+        seconds, so a slow upstream can't hold every gunicorn worker
+
+    `model_factory()` returns an object with generate_content(prompt) -> .text
+    and generate_content(prompt, stream=True) -> iterable of chunks with .text;
+    pass a fake one to run without the network.
+    """
+    def __init__(self, model_factory, cache_size=256, ttl=3600, max_concurrent=4, timeout=30, queue_wait=2):
+        self.model_factory = model_factory
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.timeout = timeout
+        self.queue_wait = queue_wait  # Seconds to wait for a free slot before answering busy
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # key -> (suggestion, stored_at)
+        self._inflight = {}  # key -> Future
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='refine')
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'timeouts': 0, 'busy': 0}
+
+    def cache_key(self, text):
+        return hashlib.sha256(f"{PROMPT_VERSION}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                self._model = self.model_factory()
+            return self._model
+
+    def _cached(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        suggestion, stored_at = entry
+        if time.time() - stored_at > self.ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return suggestion
+
+    def _store(self, key, suggestion):
+        self._cache[key] = (suggestion, time.time())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def refine(self, text):
+        """Returns the suggestion for `text`; raises RefineError (or a subclass) on failure."""
+        key = self.cache_key(text)
+        with self._lock:
+            suggestion = self._cached(key)
+            if suggestion is not None:
+                self.stats['hits'] += 1
+                return suggestion
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if leader:
+            try:
+                suggestion = self._call_model((text or '').strip())
+                with self._lock:
+                    self._store(key, suggestion)
+                future.set_result(suggestion)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+        try:
+            # The leader may queue for a slot before its own timeout starts
+            return future.result(timeout=self.timeout + self.queue_wait)
+        except TimeoutError:
+            raise RefineTimeout(f"No suggestion within {self.timeout}s")
+
+    def _call_model(self, text):
+        if not self._slots.acquire(timeout=self.queue_wait):
+            self.stats['busy'] += 1
+            raise RefineBusy("Too many refinements in progress, try again shortly")
+        try:
+            call = self._executor.submit(self._generate, build_prompt(text))
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot frees when the upstream call really ends, even after we stop waiting,
+        # so abandoned calls still count against the limit
+        call.add_done_callback(lambda _: self._slots.release())
+        try:
+            return call.result(timeout=self.timeout)
+        except TimeoutError:
+            self.stats['timeouts'] += 1
+            raise RefineTimeout(f"No suggestion within {self.timeout}s")
+
+    def _generate(self, prompt):
+        try:
+            with span('gemini.generate_content'):
+                return self.model().generate_content(prompt).text
+        except Exception as e:
+            raise RefineError(str(e)) from e
+
+    def stream(self, text):
+        """
+        Like refine(), but returns an iterator over the suggestion's text chunks
+        as the model writes them. Cache hits and requests joining an identical
+        call already in flight get the whole suggestion as one chunk.
+
+        RefineBusy is raised here, before anything is streamed; later failures
+        (including `timeout` seconds without a new chunk) are raised by the iterator.
+        """
+        key = self.cache_key(text)
+        with self._lock:
+            suggestion = self._cached(key)
+            if suggestion is not None:
+                self.stats['hits'] += 1
+                return iter([suggestion])
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return self._await(future)
+            future = Future()
+            self._inflight[key] = future
+            self.stats['misses'] += 1
+
+        try:
+            chunks = self._start_stream(key, future, build_prompt((text or '').strip()))
+        except Exception as e:
+            self._settle(key, future, error=e)
+            raise
+        return self._relay(key, future, chunks)
+
+    def _settle(self, key, future, result=None, error=None):
+        """Resolves an in-flight call once; later attempts (e.g. after a timeout) are ignored."""
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if future.done():
+                return
+            if error is None:
+                self._store(key, result)
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _await(self, future):
+        try:
+            yield future.result(timeout=self.timeout + self.queue_wait)
+        except TimeoutError:
+            raise RefineTimeout(f"No suggestion within {self.timeout}s")
+
+    def _start_stream(self, key, future, prompt):
+        """
+        Runs the streaming model call on the pool and returns the queue its chunks
+        arrive on. The pool thread settles `future`, so the cache and any waiters
+        are served even if the streaming client disconnects.
+        """
+        if not self._slots.acquire(timeout=self.queue_wait):
+            self.stats['busy'] += 1
+            raise RefineBusy("Too many refinements in progress, try again shortly")
+        chunks = queue.Queue()
+
+        def produce():
+            parts = []
+            try:
+                with span('gemini.generate_content.stream'):
+                    for chunk in self.model().generate_content(prompt, stream=True):
+                        if chunk.text:
+                            parts.append(chunk.text)
+                            chunks.put(('chunk', chunk.text))
+                self._settle(key, future, result=''.join(parts))
+                chunks.put(('done', None))
+            except Exception as e:
+                error = RefineError(str(e))
+                self._settle(key, future, error=error)
+                chunks.put(('error', error))
+            finally:
+                self._slots.release()
+
+        try:
+            self._executor.submit(produce)
+        except BaseException:
+            self._slots.release()
+            raise
+        return chunks
+
+    def _relay(self, key, future, chunks):
+        while True:
+            try:
+                kind, value = chunks.get(timeout=self.timeout)
+            except queue.Empty:
+                self.stats['timeouts'] += 1
+                error = RefineTimeout(f"No output for {self.timeout}s")
+                self._settle(key, future, error=error)
+                raise error
+            if kind == 'error':
+                raise value
+            if kind == 'done':
+                return
+            yield value
@@ -47,20 +47,65 @@ async function refineText(elementId) {
     btn.disabled = true;
 
     try {
-        const response = await fetch('/api/refine', {
+        // Streamed as Server-Sent Events, so the rewrite appears while it is written
+        const response = await fetch('/api/refine?stream=sse', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ text: originalText })
         });
 
-        const data = await response.json();
-        if (data.suggestion) {
-            el.value = data.suggestion;
+        if (!response.ok) {
+            const data = await response.json();
+            alert("AI Error: " + (data.error || response.status));
+            return;
         }
+
+        let started = false;
+        await readEvents(response, (kind, data) => {
+            if (kind === 'chunk') {
+                if (!started) {
+                    el.value = "";
+                    started = true;
+                }
+                el.value += data.text;
+            } else if (kind === 'done') {
+                el.value = data.suggestion;
+            } else if (kind === 'error') {
+                el.value = originalText;
+                alert("AI Error: " + data.error);
+            }
+        });
     } catch (e) {
+        el.value = originalText;
         alert("AI Error: " + e);
     } finally {
         btn.innerText = "✨ Refine with AI";
         btn.disabled = false;
     }
 }
+
+// Calls onEvent(kind, data) for each `event:`/`data:` block of an SSE response body
+async function readEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let end;
+        while ((end = buffer.indexOf("\n\n")) !== -1) {
+            const block = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+            let kind = "message";
+            let data = "";
+            for (const line of block.split("\n")) {
+                if (line.startsWith("event: ")) kind = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+            }
+            onEvent(kind, JSON.parse(data));
+        }
+    }
+}
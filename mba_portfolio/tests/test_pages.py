@@ -0,0 +1,27 @@
+import os
+import shutil
+
+import app as portfolio
+from content_store import ContentStore
+
+
+def test_quick_consecutive_saves_change_the_etag(tmp_path, monkeypatch):
+    path = str(tmp_path / 'content.json')
+    shutil.copy(os.path.join(os.path.dirname(portfolio.__file__), portfolio.DATA_FILE), path)
+    store = ContentStore(path)
+    monkeypatch.setattr(portfolio, 'CONTENT', store)
+    client = portfolio.app.test_client()
+    content = store.get()
+
+    etags = []
+    for headline in ('First headline.', 'Other headline.'):  # Same length: size can't tell them apart
+        mtime = os.stat(path).st_mtime_ns
+        store.save(dict(content, home=dict(content['home'], headline=headline)))
+        os.utime(path, ns=(mtime, mtime))  # As if both saves landed in one mtime tick
+        response = client.get('/')
+        assert headline in response.get_data(as_text=True)
+        etags.append(response.headers['ETag'])
+
+    assert etags[0] != etags[1]
+    assert client.get('/', headers={'If-None-Match': etags[0]}).status_code == 200
+    assert client.get('/', headers={'If-None-Match': etags[1]}).status_code == 304
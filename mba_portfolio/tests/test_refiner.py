@@ -0,0 +1,226 @@
+import json
+import time
+import types
+import threading
+
+import pytest
+
+import app as portfolio
+from refiner import Refiner, RefineBusy, RefineTimeout
+
+
+class FakeModel:
+    """Stands in for the Gemini model: echoes the prompt's input text after `delay` seconds."""
+    def __init__(self, delay=0.0, chunks=None, fail_after=None):
+        self.delay = delay
+        self.chunks = chunks or ['Decided ', 'under ', 'constraints.']
+        self.fail_after = fail_after  # Raise after this many streamed chunks
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        self.release.wait()
+        time.sleep(self.delay)
+        if stream:
+            return self._stream()
+        return types.SimpleNamespace(text='Refined: ' + prompt.split('"')[-2])  # The quoted input text
+
+    def _stream(self):
+        for i, text in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError('upstream reset')
+            yield types.SimpleNamespace(text=text)
+
+
+def make_refiner(model, **kwargs):
+    return Refiner(lambda: model, **kwargs)
+
+
+def test_cache_hit_skips_the_model():
+    model = FakeModel()
+    refiner = make_refiner(model)
+    assert refiner.refine('Led the team.') == 'Refined: Led the team.'
+    # Whitespace differences normalize to the same key
+    assert refiner.refine('  Led the\n team. ') == 'Refined: Led the team.'
+    assert model.calls == 1
+    assert refiner.stats['hits'] == 1
+
+
+def test_cache_expires_after_ttl():
+    model = FakeModel()
+    refiner = make_refiner(model, ttl=0)
+    refiner.refine('Led the team.')
+    time.sleep(0.01)
+    refiner.refine('Led the team.')
+    assert model.calls == 2
+
+
+def test_identical_requests_in_flight_share_one_call():
+    model = FakeModel()
+    model.release.clear()
+    refiner = make_refiner(model)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(refiner.refine('Same paragraph.'))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    while refiner.stats['misses'] + refiner.stats['coalesced'] < 5:
+        time.sleep(0.01)
+    model.release.set()
+    for t in threads:
+        t.join()
+
+    assert results == ['Refined: Same paragraph.'] * 5
+    assert model.calls == 1
+    assert refiner.stats['coalesced'] == 4
+
+
+def test_slow_model_times_out():
+    refiner = make_refiner(FakeModel(delay=0.5), timeout=0.1)
+    with pytest.raises(RefineTimeout):
+        refiner.refine('Slow paragraph.')
+    assert refiner.stats['timeouts'] == 1
+
+
+def test_full_slots_answer_busy():
+    model = FakeModel()
+    model.release.clear()
+    refiner = make_refiner(model, max_concurrent=1, queue_wait=0.05)
+    holder = threading.Thread(target=refiner.refine, args=('First paragraph.',))
+    holder.start()
+    while model.calls == 0:
+        time.sleep(0.01)
+    try:
+        with pytest.raises(RefineBusy):
+            refiner.refine('Second paragraph.')
+    finally:
+        model.release.set()
+        holder.join()
+
+
+# --- /api/refine ---
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('ADMIN_PASSWORD', 'test')
+    monkeypatch.setenv('GEMINI_API_KEY', 'test')
+    monkeypatch.setattr(portfolio, 'BACKGROUND_PID', portfolio.os.getpid())  # No client preload thread
+    client = portfolio.app.test_client()
+    client.post('/login', data={'password': 'test'})
+    return client
+
+
+def use_refiner(monkeypatch, model, **kwargs):
+    refiner = make_refiner(model, **kwargs)
+    monkeypatch.setattr(portfolio, 'REFINER', refiner)
+    return refiner
+
+
+def test_api_refine_returns_suggestion(client, monkeypatch):
+    use_refiner(monkeypatch, FakeModel())
+    response = client.post('/api/refine', json={'text': 'Led the team.'})
+    assert response.status_code == 200
+    assert response.get_json() == {'suggestion': 'Refined: Led the team.'}
+
+
+def test_api_refine_timeout_is_504(client, monkeypatch):
+    use_refiner(monkeypatch, FakeModel(delay=0.5), timeout=0.1)
+    response = client.post('/api/refine', json={'text': 'Slow paragraph.'})
+    assert response.status_code == 504
+    assert 'error' in response.get_json()
+
+
+def test_api_refine_busy_is_503(client, monkeypatch):
+    model = FakeModel()
+    model.release.clear()
+    refiner = use_refiner(monkeypatch, model, max_concurrent=1, queue_wait=0.05)
+    holder = threading.Thread(target=refiner.refine, args=('First paragraph.',))
+    holder.start()
+    while model.calls == 0:
+        time.sleep(0.01)
+    try:
+        response = client.post('/api/refine', json={'text': 'Second paragraph.'})
+        assert response.status_code == 503
+    finally:
+        model.release.set()
+        holder.join()
+
+
+def test_api_refine_requires_login(monkeypatch):
+    use_refiner(monkeypatch, FakeModel())
+    response = portfolio.app.test_client().post('/api/refine', json={'text': 'Led the team.'})
+    assert response.status_code == 302
+
+
+# --- /api/refine?stream=sse ---
+
+def sse_events(response):
+    """[(event, data), ...] from a text/event-stream body."""
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_sse_streams_chunks_then_done(client, monkeypatch):
+    model = FakeModel()
+    use_refiner(monkeypatch, model)
+    response = client.post('/api/refine?stream=sse', json={'text': 'Led the team.'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert sse_events(response) == [
+        ('chunk', {'text': 'Decided '}),
+        ('chunk', {'text': 'under '}),
+        ('chunk', {'text': 'constraints.'}),
+        ('done', {'suggestion': 'Decided under constraints.'}),
+    ]
+
+    # The finished stream is cached: a repeat is one chunk, without a model call
+    again = client.post('/api/refine?stream=sse', json={'text': 'Led the team.'})
+    assert sse_events(again) == [
+        ('chunk', {'text': 'Decided under constraints.'}),
+        ('done', {'suggestion': 'Decided under constraints.'}),
+    ]
+    assert model.calls == 1
+
+
+def test_sse_upstream_failure_ends_with_error_event(client, monkeypatch):
+    use_refiner(monkeypatch, FakeModel(fail_after=1))
+    events = sse_events(client.post('/api/refine?stream=sse', json={'text': 'Led the team.'}))
+
+    assert events[0] == ('chunk', {'text': 'Decided '})
+    assert events[-1] == ('error', {'error': 'upstream reset', 'status': 502})
+    assert len(events) == 2
+
+
+def test_sse_stalled_stream_ends_with_timeout_event(client, monkeypatch):
+    use_refiner(monkeypatch, FakeModel(delay=0.5), timeout=0.1)
+    events = sse_events(client.post('/api/refine?stream=sse', json={'text': 'Led the team.'}))
+
+    assert [kind for kind, _ in events] == ['error']
+    assert events[0][1]['status'] == 504
+
+
+def test_sse_busy_is_503_before_streaming(client, monkeypatch):
+    model = FakeModel()
+    model.release.clear()
+    refiner = use_refiner(monkeypatch, model, max_concurrent=1, queue_wait=0.05)
+    holder = threading.Thread(target=refiner.refine, args=('First paragraph.',))
+    holder.start()
+    while model.calls == 0:
+        time.sleep(0.01)
+    try:
+        response = client.post('/api/refine?stream=sse', json={'text': 'Second paragraph.'})
+        assert response.status_code == 503
+        assert response.mimetype == 'application/json'
+    finally:
+        model.release.set()
+        holder.join()
+
+
+def test_unknown_stream_mode_is_400(client, monkeypatch):
+    use_refiner(monkeypatch, FakeModel())
+    assert client.post('/api/refine?stream=ws', json={'text': 'Led the team.'}).status_code == 400
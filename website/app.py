@@ -1,81 +1,157 @@
-from flask import Flask, render_template, url_for
+from flask import Flask, render_template
 import os
 import json
 import time
+import tempfile
+import threading
 from dotenv import load_dotenv
-import yt_dlp
+from instrumentation import instrument, span
+from lab_common.http_cache import HttpCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, assume a single process
+    fcntl = None
 
 load_dotenv()
 
 app = Flask(__name__)
+instrument(app)
 
 # Configuration
-PHOTO_FOLDER = os.path.join('static', 'photos')
 CONTENT_FILE = os.path.join('content', 'content.json')
 MUSIC_CHANNEL_ID = os.environ.get('MUSIC_CHANNEL_ID')
 
-# Cache for music
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+# Cache for music, kept fresh by music_refresher(); requests only ever read it
 MUSIC_CACHE = {
     'data': [],
-    'last_updated': 0
+    'last_updated': 0,
+    'last_attempt': 0,
+    'file_mtime': 0
 }
 CACHE_DURATION = 43200 # 12 hours
+REFRESH_MARGIN = 3600  # Refresh this long before the cache expires
+RETRY_INTERVAL = 900   # Wait after a failed crawl
+CHECK_INTERVAL = 60
+# Last good playlist, shared by all workers and kept across deploys and restarts
+MUSIC_CACHE_FILE = os.path.join('content', 'music_cache.json')
+MUSIC_LOCK_FILE = os.path.join('content', 'music_cache.lock')
+MUSIC_REFRESH_LOCK = threading.Lock()
 
-def get_latest_songs():
-    """Fetches top 5 videos from the channel's Uploads playlist."""
-    global MUSIC_CACHE
-    if not MUSIC_CHANNEL_ID:
-        return []
+def fetch_latest_songs():
+    """Crawls the top videos of the channel's Uploads playlist. Slow; background thread only."""
+    import yt_dlp  # Heavy, and only the refresher thread needs it
+    # Convert Channel ID (UC...) to Uploads Playlist ID (UU...)
+    # If it's already a playlist (PL...) or uploads (UU...), use as is.
+    if MUSIC_CHANNEL_ID.startswith('UC'):
+         playlist_id = MUSIC_CHANNEL_ID.replace('UC', 'UU', 1)
+    else:
+         playlist_id = MUSIC_CHANNEL_ID
+    playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
 
-    # Check cache
-    if time.time() - MUSIC_CACHE['last_updated'] < CACHE_DURATION and MUSIC_CACHE['data']:
-        return MUSIC_CACHE['data']
-    
-    # Fetch fresh
-    try:
-        # Convert Channel ID (UC...) to Uploads Playlist ID (UU...)
-        # If it's already a playlist (PL...) or uploads (UU...), use as is.
-        if MUSIC_CHANNEL_ID.startswith('UC'):
-             playlist_id = MUSIC_CHANNEL_ID.replace('UC', 'UU', 1) 
-        else:
-             playlist_id = MUSIC_CHANNEL_ID
-        playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
-        
-        ydl_opts = {
-            'quiet': True,
-            'extract_flat': True,
-            'playlistend': 9,
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+    ydl_opts = {
+        'quiet': True,
+        'extract_flat': True,
+        'playlistend': 9,
+    }
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with span('yt_dlp.extract_info'):
             info = ydl.extract_info(playlist_url, download=False)
-            if 'entries' in info:
-                # Return list of full URLs
-                urls = [f"https://www.youtube.com/watch?v={entry['id']}" for entry in info['entries']]
-                MUSIC_CACHE['data'] = urls
-                MUSIC_CACHE['last_updated'] = time.time()
-                print(f"Refreshed Music Cache: {len(urls)} songs")
-                return urls
+    if not info or 'entries' not in info:
+        raise ValueError("playlist has no entries")
+    # Return list of full URLs
+    return [f"https://www.youtube.com/watch?v={entry['id']}" for entry in info['entries']]
+
+def load_music_cache():
+    """Picks up the playlist last saved by any worker. One stat() when nothing changed."""
+    mtime = _mtime(MUSIC_CACHE_FILE)
+    if not mtime or mtime == MUSIC_CACHE['file_mtime']:
+        return
+    try:
+        with open(MUSIC_CACHE_FILE, 'r') as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable music cache: {e}")
+        saved = {}
+    MUSIC_CACHE['file_mtime'] = mtime
+    # A different channel's playlist is no use, however fresh
+    if saved.get('channel') == MUSIC_CHANNEL_ID and saved.get('data'):
+        MUSIC_CACHE['data'] = saved['data']
+        MUSIC_CACHE['last_updated'] = saved['last_updated']
+
+def save_music_cache():
+    """Writes beside the target then renames, so readers never see a partial file."""
+    saved = {'channel': MUSIC_CHANNEL_ID, 'data': MUSIC_CACHE['data'], 'last_updated': MUSIC_CACHE['last_updated']}
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(MUSIC_CACHE_FILE), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(saved, f)
+    os.replace(tmp, MUSIC_CACHE_FILE)
+    MUSIC_CACHE['file_mtime'] = _mtime(MUSIC_CACHE_FILE)
+
+def music_needs_refresh():
+    now = time.time()
+    due = now - MUSIC_CACHE['last_updated'] > CACHE_DURATION - REFRESH_MARGIN
+    return due and now - MUSIC_CACHE['last_attempt'] > RETRY_INTERVAL
+
+def refresh_music():
+    """
+    Crawls the playlist and saves it. Single-flight: concurrent calls in this
+    process return at once, and a flock keeps other workers from crawling too.
+    On failure the previous playlist stays in place.
+    """
+    if not MUSIC_REFRESH_LOCK.acquire(blocking=False):
+        return
+    lock_fd = None
+    try:
+        if fcntl is not None:
+            lock_fd = os.open(MUSIC_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return  # Another worker is crawling; its result arrives via load_music_cache
+        load_music_cache()  # Another worker may have refreshed while we waited
+        if not music_needs_refresh():
+            return
+        MUSIC_CACHE['last_attempt'] = time.time()
+        urls = fetch_latest_songs()
+        MUSIC_CACHE['data'] = urls
+        MUSIC_CACHE['last_updated'] = time.time()
+        save_music_cache()
+        print(f"Refreshed Music Cache: {len(urls)} songs")
     except Exception as e:
         print(f"Error fetching music: {e}")
-        return MUSIC_CACHE['data'] # Return old data if fail
-    
-    return []
+    finally:
+        if lock_fd is not None:
+            os.close(lock_fd)  # Also releases the flock
+        MUSIC_REFRESH_LOCK.release()
 
-def get_photos():
-    """Returns a list of filenames in the photo folder."""
-    if not os.path.exists(PHOTO_FOLDER):
-        os.makedirs(PHOTO_FOLDER)
-    
-    # Get all valid image files
-    files = [f for f in os.listdir(PHOTO_FOLDER) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp'))]
-    return files
+def music_refresher():
+    """Background loop: warms the cache at startup, then refreshes it before it expires."""
+    while True:
+        load_music_cache()
+        if music_needs_refresh():
+            refresh_music()
+        time.sleep(CHECK_INTERVAL)
+
+def get_latest_songs():
+    """Latest music URLs from the cache. Never crawls, so it never blocks a request."""
+    if not MUSIC_CHANNEL_ID:
+        return []
+    load_music_cache()
+    return MUSIC_CACHE['data']
 
 def get_videos():
     """Reads video links from content.json"""
     if not os.path.exists(CONTENT_FILE):
         return {}
-    with open(CONTENT_FILE, 'r') as f:
+    with span('load_content'), open(CONTENT_FILE, 'r') as f:
         try:
             return json.load(f)
         except:
@@ -92,33 +168,62 @@ def get_video_id(url):
         
     return url # Fallback
 
+# --- HTTP Caching ---
+# Rendered home page (reused until content_version() changes) and fingerprinted static files
+HTTP_CACHE = HttpCache(app)
+
+def content_version():
+    """Everything the home page is built from: content.json and the music cache."""
+    return (_mtime(CONTENT_FILE), MUSIC_CACHE['last_updated'])
+
+# --- Startup ---
+# Importing this module starts nothing, so gunicorn can preload it in the
+# master and fork workers from it (see gunicorn.conf.py); each worker then
+# starts its own refresher thread, since threads don't survive a fork.
+BACKGROUND_PID = None
+
+def warm():
+    """Loads what the home page needs, before any traffic is accepted."""
+    if MUSIC_CHANNEL_ID:
+        load_music_cache()  # Last good playlist renders immediately, even right after a deploy
+    HTTP_CACHE.warm()  # ?v= hashes for url_for('static', ...)
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+def start_background():
+    """Starts this process's music refresher; safe to call again."""
+    global BACKGROUND_PID
+    if BACKGROUND_PID == os.getpid() or not MUSIC_CHANNEL_ID:
+        return
+    BACKGROUND_PID = os.getpid()
+    threading.Thread(target=music_refresher, daemon=True).start()
+
+@app.before_request
+def ensure_background():
+    # Covers servers that don't run the gunicorn.conf.py hooks
+    start_background()
+
 @app.context_processor
 def utility_processor():
     return dict(get_video_id=get_video_id)
 
 @app.route('/')
 def home():
-    photos = get_photos()
-    videos = get_videos()
-    
-    # Overwrite the 'music' key in videos if we have dynamic data
+    # Picks up a refresh from any worker, which moves content_version()
     latest_music = get_latest_songs()
-    if latest_music:
-        videos['music'] = latest_music
-        
-    return render_template('index.html', photos=photos, videos=videos)
 
-@app.after_request
-def add_header(response):
-    """
-    Add headers to disable caching so updates appear instantly.
-    """
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return response
+    def render():
+        videos = get_videos()
+        # Overwrite the 'music' key in videos if we have dynamic data
+        if latest_music:
+            videos['music'] = latest_music
+        return render_template('index.html', videos=videos)
+
+    return HTTP_CACHE.page('home', content_version(), render)
 
 if __name__ == '__main__':
     print(f"Project 2 running locally. Open http://localhost:5002")
+    warm()
+    start_background()
     # Put some demo photos if empty?
     app.run(debug=True, port=5002)
@@ -0,0 +1,13 @@
+# Gunicorn settings and hooks, shared by every app in the lab, from the copy of
+# lab_common/ in this directory (see instrumentation.py). gunicorn reads this
+# file before it changes into --chdir, so this directory goes on the path first.
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)
+
+from lab_common.gunicorn_conf import preload_app, when_ready, post_worker_init  # noqa: E402
+
+__all__ = ['preload_app', 'when_ready', 'post_worker_init']
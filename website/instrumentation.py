@@ -0,0 +1,6 @@
+# Request metrics, spans and the slow-request profiler are shared by every app
+# in the lab. The website deploys on its own (see Procfile), without the repo
+# around it, so it carries a copy of lab_common/ next to this file.
+from lab_common.instrumentation import METRICS, Metrics, SlowRequestProfiler, instrument, span
+
+__all__ = ['METRICS', 'Metrics', 'SlowRequestProfiler', 'instrument', 'span']
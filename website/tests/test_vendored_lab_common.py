@@ -0,0 +1,16 @@
+import filecmp
+import os
+
+import pytest
+
+WEBSITE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED = os.path.join(os.path.dirname(WEBSITE), 'lab_common')
+VENDORED = os.path.join(WEBSITE, 'lab_common')
+
+
+@pytest.mark.skipif(not os.path.isdir(SHARED), reason='deployed on its own, without the repo')
+def test_vendored_lab_common_matches_the_shared_copy():
+    names = sorted(n for n in os.listdir(SHARED) if n.endswith('.py'))
+    assert sorted(n for n in os.listdir(VENDORED) if n.endswith('.py')) == names
+    _, mismatch, errors = filecmp.cmpfiles(SHARED, VENDORED, names, shallow=False)
+    assert not mismatch and not errors, f'copy lab_common/ into website/ again: {mismatch + errors}'